@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# size and speed of the full text table with and without compression, with the text of a database:
+# python3 benchdb.py [database] [word ...]
+# without words, the most frequent ones in the text are searched
+
+import os
+import re
+import sys
+import shutil
+import sqlite3
+import tempfile
+from time import time
+from collections import Counter
+from searcherdb import open_readonly, register_compression
+from searcherrank import register_functions, MATCHINFO_FORMAT
+
+# times each query is repeated
+REPEAT = 5
+# results of each query, and of them the snippets read
+TOP_K = 100
+SNIPPETS = 10
+
+main_dir = os.getcwd()
+
+def read_rows(_path):
+    con = open_readonly(_path)
+    _rows = con.execute("""select docid, content, metadata, tag1 from tabella""").fetchall()
+    con.close()
+    return _rows
+
+# the most frequent words in the first rows
+def frequent_words(_rows, _n=5):
+    _count = Counter()
+    for el in _rows[:500]:
+        _count.update(re.findall(r"\w{5,}", (el[1] or "").lower()))
+    return [el for (el, _c) in _count.most_common(_n)]
+
+def build(_path, _options, _rows):
+    con = sqlite3.connect(_path)
+    register_compression(con)
+    _t = time()
+    con.execute("""create virtual table tabella using fts4({})""".format(_options))
+    con.executemany("""insert into tabella (docid, content, metadata, tag1) values (?,?,?,?)""", _rows)
+    con.execute("""insert into tabella(tabella) values('optimize')""")
+    con.commit()
+    _elapsed = time()-_t
+    con.execute("""vacuum""")
+    con.close()
+    return _elapsed, os.path.getsize(_path)
+
+# milliseconds of the ranked search, and of reading the snippets of the first results
+def query_times(_path, _word):
+    con = sqlite3.connect(_path)
+    register_compression(con)
+    register_functions(con)
+    _search = _snippets = 0
+    for i in range(REPEAT):
+        _t = time()
+        _docids = [el[0] for el in con.execute("""select docid from tabella where tabella match ? order by bm25(matchinfo(tabella, '{}'), 1, 2, 2) desc limit ?""".format(MATCHINFO_FORMAT), (_word, TOP_K))]
+        _search += time()-_t
+        _t = time()
+        for _docid in _docids[:SNIPPETS]:
+            con.execute("""select offsets(tabella), content from tabella where docid=? and tabella match ?""", (_docid, _word)).fetchall()
+        _snippets += time()-_t
+    con.close()
+    return 1000*_search/REPEAT, 1000*_snippets/REPEAT, len(_docids)
+
+def main(_args):
+    _path = _args[0] if _args else os.path.join(main_dir, "DATABASE", "default.db")
+    _rows = read_rows(_path)
+    _words = _args[1:] or frequent_words(_rows)
+    _dir = tempfile.mkdtemp(prefix="searcher_bench_")
+    try:
+        print("{} rows, {:.1f} MB of text".format(len(_rows), sum(len(el[1] or "") for el in _rows)/1048576))
+        _variants = [("plain", "content, metadata, tag1"), ("compressed", "content, metadata, tag1, compress=searcher_compress, uncompress=searcher_uncompress")]
+        for (_name, _options) in _variants:
+            _db = os.path.join(_dir, _name+".db")
+            _elapsed, _size = build(_db, _options, _rows)
+            print("\n{}: {:.2f} MB, built in {:.2f} s".format(_name, _size/1048576, _elapsed))
+            for _word in _words:
+                _search, _snippets, _found = query_times(_db, _word)
+                print("  {:<20} {:>5} results  search {:8.2f} ms  {} snippets {:8.2f} ms".format(_word, _found, _search, SNIPPETS, _snippets))
+    finally:
+        shutil.rmtree(_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
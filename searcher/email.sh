@@ -2,4 +2,4 @@
 
 thisdir=$(dirname "$0")
 cd $thisdir
-# fields: From: - Date:
+# fields: From: - Date: - mbox file - byte offset of the message in the mbox file
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+# the extractors of each mimetype, from the manifest extractors/extractors.cfg:
+# the manifest is read without importing the extractors, each one is imported
+# the first time a file of its mimetypes is extracted
+
+import os
+import sys
+import importlib
+import configparser
+
+# the folder of the extractors and their manifest
+module_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extractors")
+MANIFEST = os.path.join(module_dir, "extractors.cfg")
+
+# the extractors imported by this process: name: module, None if the import failed
+_loaded = {}
+
+# the registry of this process
+_registry = None
+
+# the extractor module, imported on first use
+def load_extractor(_name):
+    if _name not in _loaded:
+        if module_dir not in sys.path:
+            sys.path.append(module_dir)
+        try:
+            _loaded[_name] = importlib.import_module(_name)
+        except ImportError:
+            _loaded[_name] = None
+    return _loaded[_name]
+
+class extractorRegistry:
+    def __init__(self, _manifest=MANIFEST):
+        # mimetype or family (text/*): [(priority, name)]
+        self.types = {}
+        # mimetypes whose new content is indexed from where the previous indexing stopped
+        self.append_mime = set()
+        # mimetype: the names of its extractors, the first to be tried first
+        self.cache = {}
+        _cfg = configparser.ConfigParser()
+        _cfg.read(_manifest)
+        for _name in _cfg.sections():
+            _priority = _cfg[_name].getint("priority", 0)
+            for _type in _cfg[_name].get("mimetypes", "").split():
+                self.types.setdefault(_type, []).append((_priority, _name))
+            self.append_mime.update(_cfg[_name].get("append", "").split())
+
+    # the names of the extractors of a mimetype, by priority: the exact mimetype first if the priority is the same
+    def candidates(self, _mime):
+        _ret = self.cache.get(_mime)
+        if _ret == None:
+            _found = [(_priority, 1, _name) for (_priority, _name) in self.types.get(_mime, [])]
+            if "/" in _mime:
+                _family = _mime.split("/")[0]+"/*"
+                _found += [(_priority, 0, _name) for (_priority, _name) in self.types.get(_family, [])]
+            _ret = []
+            for (_priority, _exact, _name) in sorted(_found, reverse=True):
+                if _name not in _ret:
+                    _ret.append(_name)
+            _ret = tuple(_ret)
+            self.cache[_mime] = _ret
+        return _ret
+
+# the registry shared by the users in this process
+def registry():
+    global _registry
+    if _registry == None:
+        _registry = extractorRegistry()
+    return _registry
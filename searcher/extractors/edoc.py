@@ -2,6 +2,7 @@
 
 import os
 import subprocess
+import officepool
 
 # name of the module
 nameModule = 'edoc'
@@ -30,8 +31,7 @@ def ffile_content(ffile):
     except:
         metadata1 = ""
     try:
-        _comm = ['libreoffice','--headless','--cat','{}'.format(ffile)]
-        ctext = subprocess.check_output(_comm, universal_newlines=True)
+        ctext = officepool.office_text(ffile)
         if len(ctext) > 0:
             ereturn = (metadata1, ctext, tag1)
             return [ereturn]
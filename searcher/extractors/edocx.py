@@ -1,4 +1,9 @@
+import os
+import io
+import zipfile
 import subprocess
+import xml.etree.ElementTree as ET
+import officepool
 
 # name of the module
 nameModule = 'edocx'
@@ -16,21 +21,100 @@ tag1=""
 hhendler = (nameModule,docType)
 # the module return: metadata, content, special tag
 ereturn = ()
+# 1 read the text and the metadata from the xml files in the document, libreoffice and exiftool only if it fails, otherwise 0
+USE_NATIVE = 1
+
+# namespaces
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
+_DCTERMS = "{http://purl.org/dc/terms/}"
+_CP = "{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}"
+_EP = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
 
 
 # tre minuscole prima della maiuscola oppure n_Name
 def nametype_Module():
     return hhendler
 
+# the text of word/document.xml, parsed a piece at a time: the parsed elements are
+# dropped, so the memory used does not depend on the size of the document
+def native_text(ffile):
+    _text = []
+    with zipfile.ZipFile(ffile) as _z:
+        with _z.open("word/document.xml") as _f:
+            # the open elements
+            _stack = []
+            for _event, _elem in ET.iterparse(_f, events=("start", "end")):
+                if _event == "start":
+                    _stack.append(_elem)
+                    continue
+                _stack.pop()
+                _tag = _elem.tag
+                if _tag == _W+"t":
+                    _text.append(_elem.text or "")
+                elif _tag == _W+"tab":
+                    _text.append("\t")
+                elif _tag in (_W+"br", _W+"cr"):
+                    _text.append("\n")
+                elif _tag == _W+"p":
+                    _text.append("\n")
+                # the element is the last child of its parent
+                if _stack and _tag in (_W+"p", _W+"tbl", _W+"sectPr"):
+                    _elem.clear()
+                    del _stack[-1][-1]
+    return "".join(_text)
+
+# the metadata from docProps/core.xml and docProps/app.xml, as exiftool
+# ffile: a path or a file object
+def native_metadata(ffile, _name, _size):
+    _data = [("File Name", _name)]
+    with zipfile.ZipFile(ffile) as _z:
+        _names = _z.namelist()
+        if "docProps/core.xml" in _names:
+            _core = ET.fromstring(_z.read("docProps/core.xml"))
+            for (_label, _tag) in [("Title", _DC+"title"), ("Subject", _DC+"subject"), ("Keywords", _CP+"keywords"), ("Description", _DC+"description"), ("Create Date", _DCTERMS+"created")]:
+                _el = _core.find(_tag)
+                if _el != None and _el.text:
+                    _data.append((_label, _el.text))
+        if "docProps/app.xml" in _names:
+            _el = ET.fromstring(_z.read("docProps/app.xml")).find(_EP+"Pages")
+            if _el != None and _el.text:
+                _data.append(("Pages", _el.text))
+    _data.append(("File Size", "{} kB".format(round(_size/1024,2))))
+    return "".join("{:<32}: {}\n".format(_label, _value) for (_label, _value) in _data)
+
+# the text of an attachment, from memory: only if USE_NATIVE is 1 and it can be read natively
+def data_content(_data, _name, _charset=None):
+    if USE_NATIVE != 1:
+        return None
+    try:
+        _f = io.BytesIO(_data)
+        ctext = native_text(_f)
+        metadata1 = native_metadata(_f, _name, len(_data))
+        if len(ctext.strip()) > 0:
+            return [(metadata1, ctext, tag1)]
+    except Exception:
+        pass
+    # from a temporary file, with libreoffice as ffile_content
+    return None
+
 def ffile_content(ffile):
+    if USE_NATIVE == 1:
+        try:
+            ctext = native_text(ffile)
+            metadata1 = native_metadata(ffile, os.path.basename(ffile), os.stat(ffile).st_size)
+            if len(ctext.strip()) > 0:
+                return [(metadata1, ctext, tag1)]
+        except Exception:
+            # to libreoffice
+            pass
     try:
         metadata1 = subprocess.check_output(["exiftool", "-FileName", "-Title", "-Subject", "-Keywords", "-Description", "-Pages", "-CreateDate", "-Document", "-FileSize", ffile], universal_newlines=True)
     except:
         metadata1 = ""
     #
     try:
-        _comm = ['libreoffice','--headless','--cat','{}'.format(ffile)]
-        ctext = subprocess.check_output(_comm, universal_newlines=True)
+        ctext = officepool.office_text(ffile)
         if len(ctext) > 0:
             ereturn = (metadata1, ctext, tag1)
             return [ereturn]
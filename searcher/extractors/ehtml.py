@@ -22,6 +22,8 @@ tag1=""
 hhendler = (nameModule,docType)
 # the module return: metadata, content, special tag
 ereturn = ()
+# characters read at a time
+CHUNK_SIZE = 65536
 
 def nametype_Module():
     return hhendler
@@ -31,6 +33,30 @@ class HTMLContent(HTMLParser):
     def handle_data(self, data):
         self.text += html.unescape(data)
 
+# the text of the file, parsed a piece at a time
+def read_chunks(ffile):
+    parser = HTMLContent()
+    with open(ffile, "r") as _f:
+        while True:
+            _data = _f.read(CHUNK_SIZE)
+            if _data == "":
+                break
+            parser.feed(_data)
+            yield parser.text
+            parser.text = ""
+    parser.close()
+    yield parser.text
+
+# the text of an attachment, from memory
+def data_content(_data, _name, _charset="utf-8"):
+    parser = HTMLContent()
+    parser.feed(bytes(_data).decode(_charset, errors="replace"))
+    parser.close()
+    if len(parser.text) > 0:
+        metadata1 = "File Name    : {}\nFile Size    : {} kB".format(_name, round(len(_data)/1024,2))
+        return [(metadata1, parser.text, tag1)]
+    return False
+
 #if False is returned then no text has been extract
 def ffile_content(ffile):
     try:
@@ -44,19 +70,9 @@ def ffile_content(ffile):
         #tag1 = "example"
     #except:
         #tag1 = ""
-    try:
-        data = ""
-        with open(ffile, "r") as _f:
-            _data = _f.read()
-        parser = HTMLContent()
-        parser.feed(_data)
-        ctext = parser.text
-        parser.close()
-        
-        if len(ctext) > 0:
-            ereturn = (metadata1, ctext, tag1)
-            return [ereturn]
-        else:
-            return False
-    except:
+    if os.access(ffile, os.R_OK) and os.stat(ffile).st_size > 0:
+        # the text is read while it is stored
+        ereturn = (metadata1, read_chunks(ffile), tag1)
+        return [ereturn]
+    else:
         return False
@@ -2,11 +2,13 @@
 # -*- coding: utf-8 -*-
 
 import os
-import glob
-import importlib
 import time
+import mmap
+import tempfile
+from extractorreg import registry, load_extractor
 
 from email.parser import Parser
+from email.parser import BytesParser
 from email.policy import default
 from email.policy import SMTP
 
@@ -39,100 +41,150 @@ _allowed_family_mimetype = []
 # 1 also the attachments will be indexed, otherwise 0
 INDEX_ATTACHMENTS = 1
 
-module_dir = os.getcwd()
-
-
-def nametype_Module():
-    return hhendler
-
-
-class mailIdexer:
-    def __init__(self, _type,_data):
-        self._type = _type
-        self._data = _data
-        self.ePlugins = []
-        self.extractors = []
-        #
-        os.chdir(module_dir)
-        #
-        self.ePlugins = glob.glob('*.py')
-        #
-        for _comm in self.ePlugins:
-            mmodule = _comm.split(".")[0]
-            try:
-                #ee = importlib.import_module(module_dir+mmodule)
-                ee = importlib.import_module(mmodule)
-                self.extractors.append(ee)
-            except ImportError as ioe:
-                pass
-        
-    def _get_content(self):
-        ret = False
-        for ee in self.extractors:
-            if self._type in ee.docType:
-                ret = ee.ffile_content(self._data)
-                break
-        #
-        return ret,self._type
-
+# max characters of the mail read, the rest is not indexed
+MAIL_MAX_SIZE = 52428800
+
+# max size of an attachment, the larger ones are skipped without decoding them
+ATTACHMENT_MAX_SIZE = 20971520
+
+# the text of the rows returned by an extractor, also if read a piece at a time
+def rows_text(_rows):
+    _text = ""
+    for el in _rows:
+        _content = el[1] if isinstance(el[1], str) else "".join(el[1])
+        _text += el[0]+"\n"+_content
+    return _text
+
+# the text of an attachment from an extractor: the extractors with data_content read it from memory,
+# if they return None they cannot, and the attachment is written in a temporary file
+def extractor_text(part, ee, _name, _data):
+    _rows = None
+    if hasattr(ee, "data_content"):
+        _rows = ee.data_content(memoryview(_data), _name, part.get_content_charset() or "utf-8")
+    if _rows == None:
+        with tempfile.NamedTemporaryFile(prefix="gsearcher_att_", suffix=os.path.splitext(_name)[1]) as _f:
+            _f.write(_data)
+            _f.flush()
+            _rows = ee.ffile_content(_f.name)
+            # the content read a piece at a time, before the file is deleted
+            return rows_text(_rows) if _rows else ""
+    return rows_text(_rows) if _rows else ""
+
+# the text of an attachment, from the extractors of its mimetype by priority
+def attachment_text(part):
+    _name = part.get_filename() or "attachment"
+    _data = part.get_payload(decode=True)
+    if not _data:
+        return ""
+    for _module in registry().candidates(part.get_content_type()):
+        ee = load_extractor(_module)
+        if ee == None or ee.__name__ == nameModule:
+            continue
+        try:
+            _text = extractor_text(part, ee, _name, _data)
+        except Exception:
+            continue
+        if _text != "":
+            return _text
+    return ""
+
+# whether an attachment is indexed, checked before decoding it
+def skip_attachment(part):
+    _content_type = part.get_content_type()
+    if _content_type.split("/")[0] in _skip_family_mimetype:
+        return True
+    if _allowed_family_mimetype and _content_type.split("/")[0] not in _allowed_family_mimetype:
+        return True
+    if not registry().candidates(_content_type):
+        return True
+    # the size of the encoded payload
+    _payload = part.get_payload()
+    if isinstance(_payload, str):
+        _size = len(_payload)
+        if part.get("content-transfer-encoding", "").lower() == "base64":
+            _size = _size*3//4
+        if _size > ATTACHMENT_MAX_SIZE:
+            return True
+    return False
+
+
+# the headers, the body and the attachments of a mail
+def mail_text(mail):
+    mail_content = ""
+    for el in ['to','cc','bc','ccn','bcc','from','subject','date']:
+        _dd = mail[el]
+        if _dd != None:
+            mail_content += el+": "+_dd+"\n"
+    ############
+    _body = mail.get_body()
+    if _body != None:
+        mail_content += _body.get_content()
+    #
+    if INDEX_ATTACHMENTS == 1:
+        for el in mail.iter_attachments():
+            if skip_attachment(el):
+                continue
+            _content_type = el.get_content_type()
+            _text = attachment_text(el)
+            if _text != "":
+                mail_content += "\n\nAttachment type: "+_content_type+"\n\n"
+                mail_content += _text
+    #
+    return mail_content
 
 def get_data_mail(ffile):
     try:
         msg = ""
-        mail_content = ""
-        att = []
         _f = open(ffile, "r")
-        msg = _f.read()
+        msg = _f.read(MAIL_MAX_SIZE)
         _f.close()
         #
         if msg != "":
             # pd
             _parser = Parser(policy=default)
             mail = _parser.parsestr(msg)
-            #
-            for el in ['to','cc','bc','ccn','bcc','from','subject','date']:
-                _dd = mail[el]
-                if _dd != None:
-                    mail_content += el+": "+_dd+"\n"
-            ############
-            mail_content += mail.get_body().get_content()
-            #
-            for el in mail.iter_attachments():
-                att.append(el)
-            #
-            if INDEX_ATTACHMENTS == 1:
-                try:
-                    i = 0
-                    for el in mail.iter_attachments():
-                        _content_type = el.get_content_type()
-                        _file = "/tmp/gsearcher_att_{}.pdf".format(i)
-                        with open(_file, 'wb') as fp:
-                            fp.write(el.get_payload(decode=True))
-                        #
-                        MI = mailIdexer(_content_type,_file)
-                        # tuple: metadata - content
-                        _data,_type = MI._get_content()
-                        if _data != False:
-                            mail_content += "\n\nAttachment type: "+_type+"\n\n"
-                            mail_content += _data[0]
-                            mail_content += _data[1]
-                            with open("/tmp/aaa.txt", "w") as _f:
-                                _f.write(mail_content)
-                        #
-                        os.unlink(_file)
-                    #
-                    i += 1
-                except:
-                    pass
-            #
-            return mail_content
+            return mail_text(mail)
         else:
             return ""
     except:
         return ""
 
+# the messages of a mbox file from the byte _offset: (start, end, message);
+# the file is mapped in memory, so only a message at a time is read
+def mbox_messages(ffile, _offset=0):
+    with open(ffile, "rb") as _f:
+        if os.fstat(_f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(_f.fileno(), 0, access=mmap.ACCESS_READ) as _mm:
+            _size = len(_mm)
+            _start = _offset
+            while _start < _size:
+                # the next message starts with a From line
+                _end = _mm.find(b"\nFrom ", _start+1)
+                if _end == -1:
+                    _end = _size
+                else:
+                    _end += 1
+                yield _start, _end, _mm[_start:min(_end, _start+MAIL_MAX_SIZE)]
+                _start = _end
+
+# a row for each message of a mbox file: metadata, content, special tag, start and end of the message
+def mbox_content(ffile, metadata1, _offset):
+    _parser = BytesParser(policy=default)
+    for (_start, _end, _msg) in mbox_messages(ffile, _offset):
+        try:
+            ctext = mail_text(_parser.parsebytes(_msg))
+        except:
+            ctext = ""
+        yield (metadata1, ctext, tag1, _start, _end)
+
+def is_mbox(ffile):
+    with open(ffile, "rb") as _f:
+        return _f.read(5) == b"From "
+
 #if False is returned then no text has been extracted
-def ffile_content(ffile):
+# _offset: for mbox files, where the messages not yet indexed start
+def ffile_content(ffile, _offset=0):
     # metadata1
     try:
         bname = os.path.basename(ffile)
@@ -143,6 +195,9 @@ def ffile_content(ffile):
         metadata1 = ""
     
     try:
+        if is_mbox(ffile):
+            # the messages are read while they are stored
+            return mbox_content(ffile, metadata1, _offset)
         ctext = get_data_mail(ffile)
         if len(ctext) > 0:
             ereturn = (metadata1, ctext, tag1)
@@ -151,4 +206,3 @@ def ffile_content(ffile):
             return False
     except:
         return False
-
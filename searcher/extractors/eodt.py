@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import os
+import io
+import zipfile
 import subprocess
+import xml.etree.ElementTree as ET
+import officepool
 
 # name of the module
 nameModule = 'eodt'
@@ -19,19 +23,123 @@ tag1=""
 hhendler = (nameModule,docType)
 # the module return: metadata, content, special tag
 ereturn = ()
+# 1 read the text and the metadata from the xml files in the document, libreoffice and exiftool only if it fails, otherwise 0
+USE_NATIVE = 1
+
+# namespaces
+_TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+_OFFICE = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+_META = "{urn:oasis:names:tc:opendocument:xmlns:meta:1.0}"
+_DC = "{http://purl.org/dc/elements/1.1/}"
 
 def nametype_Module():
     return hhendler
 
+# the text of a paragraph with its spaces, tabs and line breaks
+def paragraph_text(_elem, _text):
+    if _elem.text:
+        _text.append(_elem.text)
+    for _child in _elem:
+        _tag = _child.tag
+        if _tag == _TEXT+"s":
+            _text.append(" "*int(_child.get(_TEXT+"c", "1")))
+        elif _tag == _TEXT+"tab":
+            _text.append("\t")
+        elif _tag == _TEXT+"line-break":
+            _text.append("\n")
+        else:
+            paragraph_text(_child, _text)
+            if _tag in (_TEXT+"p", _TEXT+"h"):
+                _text.append("\n")
+        if _child.tail:
+            _text.append(_child.tail)
+
+# the text of content.xml, parsed a paragraph at a time: the parsed paragraphs are
+# dropped, so the memory used does not depend on the size of the document
+def native_text(ffile):
+    _text = []
+    with zipfile.ZipFile(ffile) as _z:
+        with _z.open("content.xml") as _f:
+            # the open elements
+            _stack = []
+            # the open paragraphs, the inner ones are read with the outer one
+            _paragraphs = 0
+            for _event, _elem in ET.iterparse(_f, events=("start", "end")):
+                _tag = _elem.tag
+                _is_paragraph = _tag in (_TEXT+"p", _TEXT+"h")
+                if _event == "start":
+                    _stack.append(_elem)
+                    if _is_paragraph:
+                        _paragraphs += 1
+                    continue
+                _stack.pop()
+                if _is_paragraph:
+                    _paragraphs -= 1
+                    if _paragraphs == 0:
+                        paragraph_text(_elem, _text)
+                        _text.append("\n")
+                        # the element is the last child of its parent
+                        _elem.clear()
+                        if _stack:
+                            del _stack[-1][-1]
+    return "".join(_text)
+
+# the metadata from meta.xml, as exiftool
+# ffile: a path or a file object
+def native_metadata(ffile, _name, _size):
+    _data = [("File Name", _name)]
+    with zipfile.ZipFile(ffile) as _z:
+        if "meta.xml" in _z.namelist():
+            _meta = ET.fromstring(_z.read("meta.xml")).find(_OFFICE+"meta")
+            if _meta != None:
+                for (_label, _tag) in [("Title", _DC+"title"), ("Subject", _DC+"subject"), ("Description", _DC+"description")]:
+                    _el = _meta.find(_tag)
+                    if _el != None and _el.text:
+                        _data.append((_label, _el.text))
+                _keywords = [el.text for el in _meta.findall(_META+"keyword") if el.text]
+                if _keywords:
+                    _data.append(("Keywords", ", ".join(_keywords)))
+                _el = _meta.find(_META+"document-statistic")
+                if _el != None and _el.get(_META+"page-count"):
+                    _data.append(("Document-statistic Page-count", _el.get(_META+"page-count")))
+                _el = _meta.find(_META+"creation-date")
+                if _el != None and _el.text:
+                    _data.append(("Create Date", _el.text))
+    _data.append(("File Size", "{} kB".format(round(_size/1024,2))))
+    return "".join("{:<32}: {}\n".format(_label, _value) for (_label, _value) in _data)
+
+# the text of an attachment, from memory: only if USE_NATIVE is 1 and it can be read natively
+def data_content(_data, _name, _charset=None):
+    if USE_NATIVE != 1:
+        return None
+    try:
+        _f = io.BytesIO(_data)
+        ctext = native_text(_f)
+        metadata1 = native_metadata(_f, _name, len(_data))
+        if len(ctext.strip()) > 0:
+            return [(metadata1, ctext, tag1)]
+    except Exception:
+        pass
+    # from a temporary file, with libreoffice as ffile_content
+    return None
+
 #if False is returned then no text has been extract
 def ffile_content(ffile):
+    if USE_NATIVE == 1:
+        try:
+            ctext = native_text(ffile)
+            metadata1 = native_metadata(ffile, os.path.basename(ffile), os.stat(ffile).st_size)
+            if len(ctext.strip()) > 0:
+                return [(metadata1, ctext, tag1)]
+        except Exception:
+            # to libreoffice
+            pass
     try:
         metadata1 = subprocess.check_output(["exiftool", "-FileName", "-Title", "-Subject", "-Keywords", "-Description", "-Document-statisticPage-count", "-CreateDate", "-FileSize", ffile], universal_newlines=True)
     except:
         metadata1 = ""
     try:
-        _comm = ['libreoffice','--headless','--cat','{}'.format(ffile)]
-        ctext = subprocess.check_output(_comm, universal_newlines=True)
+        ctext = officepool.office_text(ffile)
         if len(ctext) > 0:
             ereturn = (metadata1, ctext, tag1)
             return [ereturn]
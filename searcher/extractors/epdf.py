@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import os
+import re
+import html
+import atexit
 import subprocess
+import multiprocessing.util
 
 # name of the module
 nameModule = 'epdf'
@@ -19,14 +23,116 @@ tag1=""
 hhendler = (nameModule,docType)
 # the module return: metadata, content, special tag
 ereturn = ()
+# where the metadata come from: "pdftotext" read together with the text in a single process
+# "exiftool" a single exiftool process for the whole indexing, the text from pdftotext
+METADATA_BACKEND = "pdftotext"
+
+# the exiftool process of this process
+_exiftool = None
+
+# exiftool running until the end of the indexing, reading the arguments from stdin
+class exiftoolProcess:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.proc = subprocess.Popen(["exiftool", "-stay_open", "True", "-@", "-"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    
+    def metadata(self, ffile):
+        _args = ["-FileName", "-Title", "-Subject", "-Keywords", "-PageCount", "-CreateDate", "-FileSize", ffile, "-execute"]
+        self.proc.stdin.write("\n".join(_args)+"\n")
+        self.proc.stdin.flush()
+        _data = []
+        while True:
+            _line = self.proc.stdout.readline()
+            # exiftool has been closed
+            if _line == "":
+                raise OSError("exiftool")
+            if _line == "{ready}\n":
+                break
+            _data.append(_line)
+        return "".join(_data)
+    
+    def close(self):
+        try:
+            self.proc.stdin.write("-stay_open\nFalse\n")
+            self.proc.stdin.flush()
+            self.proc.wait(5)
+        except Exception:
+            self.proc.kill()
+
+def _close_exiftool():
+    global _exiftool
+    if _exiftool != None:
+        _exiftool.close()
+        _exiftool = None
+
+def exiftool_metadata(ffile):
+    global _exiftool
+    # also if inherited from the parent process
+    if _exiftool == None or _exiftool.pid != os.getpid() or _exiftool.proc.poll() != None:
+        _exiftool = exiftoolProcess()
+        atexit.register(_close_exiftool)
+        # the processes of a pool do not execute the atexit functions
+        multiprocessing.util.Finalize(None, _close_exiftool, exitpriority=10)
+    return _exiftool.metadata(ffile)
+
+# D:20200131124500+01'00' to 2020:01:31 12:45:00+01:00, as exiftool;
+# the header of pdftotext -htmlmeta has the date without D:
+def pdf_date(_date):
+    _m = re.match(r"(?:D:)?(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Z+-])?(\d{2})?'?(\d{2})?", _date)
+    if _m == None:
+        return _date
+    _g = [el or "00" for el in _m.groups()]
+    # month and day
+    _g[1] = _m.group(2) or "01"
+    _g[2] = _m.group(3) or "01"
+    _ret = "{}:{}:{} {}:{}:{}".format(_g[0], _g[1], _g[2], _g[3], _g[4], _g[5])
+    if _m.group(7) == "Z":
+        _ret += "Z"
+    elif _m.group(7):
+        _ret += "{}{}:{}".format(_m.group(7), _g[7], _g[8])
+    return _ret
+
+# the text and the metadata with a single pdftotext process: the metadata are in the html header,
+# the pages are separated by a form feed
+def pdftotext_meta(ffile):
+    _out = subprocess.check_output(["pdftotext", "-htmlmeta", ffile, "-"], universal_newlines=True)
+    _pos = _out.find("<pre>")
+    _head = _out[:_pos]
+    ctext = _out[_pos+6:_out.rfind("</pre>")]
+    _info = {}
+    _m = re.search(r"<title>(.*?)</title>", _head, re.S)
+    if _m != None:
+        _info["Title"] = html.unescape(_m.group(1))
+    for (_name, _value) in re.findall(r'<meta name="([^"]*)" content="([^"]*)"', _head):
+        _info[_name] = html.unescape(_value)
+    _data = [("File Name", os.path.basename(ffile))]
+    for (_label, _name) in [("Title", "Title"), ("Subject", "Subject"), ("Keywords", "Keywords")]:
+        if _info.get(_name):
+            _data.append((_label, _info[_name]))
+    _data.append(("Page Count", ctext.count("\f")))
+    if _info.get("CreationDate"):
+        _data.append(("Create Date", pdf_date(_info["CreationDate"])))
+    _data.append(("File Size", "{} kB".format(round(os.stat(ffile).st_size/1024,2))))
+    metadata1 = "".join("{:<32}: {}\n".format(_label, _value) for (_label, _value) in _data)
+    return metadata1, ctext.replace("\f", "\n")
 
 def nametype_Module():
     return hhendler
 
 #if False is returned then no text has been extract
 def ffile_content(ffile):
+    if METADATA_BACKEND == "pdftotext":
+        try:
+            metadata1, ctext = pdftotext_meta(ffile)
+            if len(ctext) > 0:
+                ereturn = (metadata1, ctext, tag1)
+                return [ereturn]
+            else:
+                return False
+        except:
+            return False
     try:
-        metadata1 = subprocess.check_output(["exiftool", "-FileName", "-Title", "-Subject", "-Keywords", "-PageCount", "-CreateDate", "-FileSize", ffile], universal_newlines=True)
+        metadata1 = exiftool_metadata(ffile)
     except:
         metadata1 = ""
     try:
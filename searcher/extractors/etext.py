@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 
 import os
-import subprocess
 import time
 # command to get the mimetype: file -b --mime-type FILE
 # name of the module
@@ -9,7 +8,7 @@ nameModule = 'etext'
 # mimetype handled
 docType = ['text/plain']
 # command execute
-command_execute = "cat"
+command_execute = "TRUE"
 # how to identify the file
 fidentify="text"
 # file metadata
@@ -20,10 +19,29 @@ tag1=""
 hhendler = (nameModule,docType)
 # the module return: metadata, content, special tag
 ereturn = ()
+# characters read at a time
+CHUNK_SIZE = 65536
 
 def nametype_Module():
     return hhendler
 
+# the text of the file, a piece at a time
+def read_chunks(ffile):
+    with open(ffile, "r") as _f:
+        while True:
+            _data = _f.read(CHUNK_SIZE)
+            if _data == "":
+                break
+            yield _data
+
+# the text of an attachment, from memory
+def data_content(_data, _name, _charset="utf-8"):
+    ctext = bytes(_data).decode(_charset, errors="replace")
+    if len(ctext) > 0:
+        metadata1 = "File Name    : {}\nFile Size    : {} kB".format(_name, round(len(_data)/1024,2))
+        return [(metadata1, ctext, tag1)]
+    return False
+
 #if False is returned then no text has been extract
 def ffile_content(ffile):
     try:
@@ -37,12 +55,9 @@ def ffile_content(ffile):
         #tag1 = "example"
     #except:
         #tag1 = ""
-    try:
-        ctext = subprocess.check_output(["cat", ffile], universal_newlines=True)
-        if len(ctext) > 0:
-            ereturn = (metadata1, ctext, tag1)
-            return [ereturn]
-        else:
-            return False
-    except:
+    if os.access(ffile, os.R_OK) and os.stat(ffile).st_size > 0:
+        # the text is read while it is stored
+        ereturn = (metadata1, read_chunks(ffile), tag1)
+        return [ereturn]
+    else:
         return False
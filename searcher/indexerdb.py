@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 
-import sqlite3
 import subprocess
 import os
 import sys
-import glob
+import fnmatch
 import magic
-import importlib
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import signal
+import json
 from pathlib import Path
 from time import sleep, gmtime, strftime, time
-from searchercfg import INDEXER_LOG
+from extractorreg import extractorRegistry, load_extractor
+from searcherdb import open_database, checkpoint, lock_database, LOCKED_EXIT
+from indexermetrics import indexerMetrics
+from searchercfg import INDEXER_LOG, INDEXER_WORKERS, INDEXER_MAX_DOC_BYTES, INDEXER_BATCH_ROWS, INDEXER_BATCH_TIME, INDEXER_OPTIMIZE
+from searchercfg import INDEXER_MAX_DEPTH, INDEXER_FOLLOW_LINKS, INDEXER_INCLUDE, INDEXER_EXCLUDE
+from searchercfg import INDEXER_DEBOUNCE, INDEXER_DEBOUNCE_MAX, INDEXER_PROGRESS, INDEXER_METRICS
+from searchercfg import INDEXER_THROTTLE, INDEXER_MAX_FILES, INDEXER_MAX_BYTES, INDEXER_MAX_LOAD, INDEXER_MAX_IOWAIT, INDEXER_PAUSE
 
 # program directory
 main_dir = os.getcwd()
@@ -18,6 +27,9 @@ homepath = str(Path.home())
 
 DATABASE = os.path.join(main_dir, "DATABASE", "default.db")
 
+# the metrics of the last indexing, see INDEXER_METRICS
+METRICS_FILE = {1: os.path.join(main_dir, "LOGS", "indexer_metrics.json"), 2: os.path.join(main_dir, "LOGS", "indexer_metrics.prom")}
+
 list_folders = []
 try:
     list_tmp = None
@@ -34,9 +46,374 @@ except Exception as E:
         folderlog.close()
     except:
         pass
+
+# the extractor plugins folder
+module_dir = os.path.join(main_dir, "extractors")
+
+# seconds between the checks of SIGTERM while waiting for the pool
+POOL_POLL = 1
+
+# seconds of the limits of files and bytes not used, e.g. while idle, which can be used later at once
+THROTTLE_BURST = 1
+
+# executed in each worker process of the pool
+def _init_worker(_module_dir):
+    # stopped by the main process, not by the handlers inherited from it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if _module_dir not in sys.path:
+        sys.path.append(_module_dir)
+
+# the text of a row, from a string or from the chunks of text yielded by the extractor,
+# up to INDEXER_MAX_DOC_BYTES bytes: returns the text and whether it has been truncated
+def collect_text(_content):
+    if isinstance(_content, str):
+        _chunks = [_content]
+    else:
+        _chunks = _content
+    _text = []
+    _size = 0
+    _truncated = False
+    try:
+        for _chunk in _chunks:
+            if INDEXER_MAX_DOC_BYTES > 0:
+                _bchunk = _chunk.encode("utf-8", "ignore")
+                if _size+len(_bchunk) > INDEXER_MAX_DOC_BYTES:
+                    # the last character may be cut
+                    _text.append(_bchunk[:INDEXER_MAX_DOC_BYTES-_size].decode("utf-8", "ignore"))
+                    _truncated = True
+                    break
+                _size += len(_bchunk)
+            _text.append(_chunk)
+    finally:
+        # the rest is not read
+        if hasattr(_chunks, "close"):
+            _chunks.close()
+    return "".join(_text), _truncated
+
+# the checksum of the bytes before _offset, to check that the first part of a file has not changed
+def resume_checksum(pathfile, _offset):
+    with open(pathfile, "rb") as _f:
+        _f.seek(max(0, _offset-4096))
+        return hashlib.sha1(_f.read(_offset-max(0, _offset-4096))).hexdigest()
+
+# extracts the content of a file: job is (modules, folder, file, mimetype, mtime, size, inode, offset, docids);
+# modules: the names of the extractors, tried in order until one extracts something;
+# offset and docids: where the content to index starts and the rows already stored, for the files indexed in parts
+# returns the pid of the process, the job with the extractor used, the extracted data, the time spent, whether the content
+# has been truncated, whether there are more rows to extract, where the next part starts and its checksum,
+# and for each extractor tried its name, the time spent and whether it failed with an error
+def _extract_file(_job):
+    _t = time()
+    _offset = _job[7]
+    pathfile = _job[1]+"/"+_job[2]
+    _attempts = []
+    for _module in _job[0]:
+        _truncated = False
+        _more = False
+        _resume = None
+        _tm = time()
+        try:
+            ee = load_extractor(_module)
+            if ee == None:
+                # not imported
+                _attempts.append((_module, 0, True))
+                continue
+            if _offset > 0:
+                freturn = ee.ffile_content(pathfile, _offset)
+            else:
+                freturn = ee.ffile_content(pathfile)
+            if freturn != False:
+                _rows = []
+                for el in freturn:
+                    # a file indexed in parts: the remaining rows with another job
+                    if len(el) > 4 and len(_rows) >= INDEXER_BATCH_ROWS:
+                        _more = True
+                        break
+                    ctext, _cut = collect_text(el[1])
+                    _truncated = _truncated or _cut
+                    # rows without text are not stored
+                    if ctext != "":
+                        _rows.append((el[0], ctext)+tuple(el[2:]))
+                    if len(el) > 4:
+                        _resume = el[4]
+                if hasattr(freturn, "close"):
+                    freturn.close()
+                freturn = _rows if _rows else False
+            # nothing new
+            if _resume == None and _offset > 0:
+                _resume = _offset
+            _sum = resume_checksum(pathfile, _resume) if _resume != None else None
+            _error = False
+        except Exception:
+            freturn = False
+            _more = False
+            _resume = _sum = None
+            _error = True
+        _attempts.append((_module, time()-_tm, _error))
+        # the next parts of the file with the same extractor
+        if freturn != False or _offset > 0:
+            return os.getpid(), ((_module,),)+tuple(_job[1:]), freturn, time()-_t, _truncated, _more, _resume, _sum, _attempts
+    return os.getpid(), _job, False, time()-_t, False, False, None, None, _attempts
+
+# whether the name or the path of a file or folder matches one of the patterns
+def match_patterns(_name, _path, _patterns):
+    for _pattern in _patterns:
+        if "/" in _pattern:
+            if fnmatch.fnmatch(_path, _pattern):
+                return True
+        elif fnmatch.fnmatch(_name, _pattern):
+            return True
+    return False
+
+# yields (folder, DirEntry) for each file in _root and its subfolders, one folder at a time;
+# each folder is visited once, so links to the folders cannot create loops;
+# onfolder is called with each folder visited, _depth is the depth of _root;
+# _visited: (device, inode) of the folders already visited, shared by the walks of all the folders to index
+def walk_folder(_root, onerror=None, onfolder=None, _depth=0, _visited=None):
+    if _visited == None:
+        _visited = set()
+    # folders still to be visited with their depth
+    _stack = [(_root, _depth)]
+    while _stack:
+        _folder, _depth = _stack.pop()
+        _subfolders = []
+        try:
+            _stat = os.stat(_folder)
+            if (_stat.st_dev, _stat.st_ino) in _visited:
+                continue
+            _visited.add((_stat.st_dev, _stat.st_ino))
+            if onfolder != None:
+                onfolder(_folder)
+            with os.scandir(_folder) as _it:
+                for _entry in _it:
+                    if match_patterns(_entry.name, _entry.path, INDEXER_EXCLUDE):
+                        continue
+                    try:
+                        if _entry.is_dir(follow_symlinks=INDEXER_FOLLOW_LINKS == 1):
+                            if INDEXER_MAX_DEPTH < 0 or _depth < INDEXER_MAX_DEPTH:
+                                _subfolders.append(_entry.path)
+                        elif _entry.is_file():
+                            if INDEXER_INCLUDE == [] or match_patterns(_entry.name, _entry.path, INDEXER_INCLUDE):
+                                yield (_folder, _entry)
+                    except OSError:
+                        continue
+        except OSError as E:
+            if onerror != None:
+                onerror(_folder, E)
+        # the subfolders in alphabetical order
+        for el in sorted(_subfolders, reverse=True):
+            _stack.append((el, _depth+1))
+
+# groups the insertions and the deletions in transactions
+class dbWriter:
+    def __init__(self, con, metrics):
+        self.con = con
+        # the time spent writing
+        self.metrics = metrics
+        self.cur = self.con.cursor()
+        # rows waiting to be inserted: (docid, name, mime, mtime, dir, content, metadata, tag1)
+        self.rinsert = []
+        # states of the files waiting to be deleted: (dir, name)
+        self.rdelete = []
+        # files found while walking the folders: (dir, name)
+        self.rseen = []
+        # rows waiting to be deleted: (docid,)
+        self.rdocids = []
+        # mimetypes waiting to be cached: (dev, ino, size, mtime, mime)
+        self.rmime = []
+        # states of the files waiting to be stored: (dir, name, mtime, size, ino, mime, docids, truncated, resume, resumesum)
+        self.rstate = []
+        # where the rows start in the file, e.g. the messages of a mbox file: (docid, offset)
+        self.roffset = []
+        # the docids are assigned here, so they can be stored in the file states
+        self.cur.execute("""select max(docid) from files""")
+        self.docid = self.cur.fetchone()[0] or 0
+        # when the last transaction has been committed
+        self._time = time()
+        # the seconds spent in flush, already in the metrics: not to be counted also in the phases calling it
+        self.flush_time = 0
+    
+    # returns the docid of the new row
+    def insert(self, _row):
+        self.docid += 1
+        self.rinsert.append((self.docid,)+_row)
+        self.check_flush()
+        return self.docid
+    
+    # deletes the state of a file, its rows are deleted by docid
+    def delete_state(self, _dir, _name):
+        self.rdelete.append((_dir, _name))
+        self.check_flush()
+    
+    def seen(self, _dir, _name):
+        self.rseen.append((_dir, _name))
+        self.check_flush()
+    
+    # _docids: the docids separated by comma, as in the file states
+    def delete_docids(self, _docids):
+        for el in _docids.split(","):
+            if el != "":
+                self.rdocids.append((int(el),))
+        self.check_flush()
+    
+    def cache_mime(self, _row):
+        self.rmime.append(_row)
+        self.check_flush()
+    
+    def store_offset(self, _docid, _offset):
+        self.roffset.append((_docid, _offset))
+        self.check_flush()
+    
+    def store_state(self, _row):
+        self.rstate.append(_row)
+        self.check_flush()
+    
+    # commits if enough rows are waiting or too much time has passed
+    def check_flush(self):
+        _waiting = len(self.rinsert)+len(self.rdelete)+len(self.rseen)+len(self.rdocids)+len(self.rmime)+len(self.rstate)+len(self.roffset)
+        if (_waiting >= INDEXER_BATCH_ROWS) or (time()-self._time >= INDEXER_BATCH_TIME):
+            self.flush()
+    
+    # the deletions first, a file to reindex is deleted before being inserted again;
+    # the generation of the index is incremented if the rows change, for the caches of the searches
+    def flush(self):
+        _start = _t = time()
+        if self.rdocids or self.rinsert:
+            self.cur.execute("""update indexgen set generation=generation+1 where id=1""")
+        if self.rseen:
+            self.cur.executemany("""insert or ignore into seenfiles (dir, name) values (?,?)""", self.rseen)
+            self.rseen = []
+        if self.rdelete:
+            self.cur.executemany("""delete from filestate where dir=(?) and name=(?)""", self.rdelete)
+            self.rdelete = []
+        if self.rdocids:
+            self.cur.executemany("""delete from tabella where docid=(?)""", self.rdocids)
+            self.cur.executemany("""delete from files where docid=(?)""", self.rdocids)
+            self.cur.executemany("""delete from rowoffset where docid=(?)""", self.rdocids)
+            self.rdocids = []
+        self.metrics.add_phase("delete", time()-_t)
+        _t = time()
+        if self.rinsert:
+            self.cur.executemany("""insert into files (docid, name, mime, mtime, dir) values (?,?,?,?,?)""", (el[:5] for el in self.rinsert))
+            self.cur.executemany("""insert into tabella (docid, content, metadata, tag1) values (?,?,?,?)""", ((el[0],)+el[5:] for el in self.rinsert))
+            self.rinsert = []
+        if self.rmime:
+            self.cur.executemany("""insert or replace into mimecache (dev, ino, size, mtime, mime) values (?,?,?,?,?)""", self.rmime)
+            self.rmime = []
+        if self.rstate:
+            self.cur.executemany("""insert or replace into filestate (dir, name, mtime, size, ino, mime, docids, truncated, resume, resumesum) values (?,?,?,?,?,?,?,?,?,?)""", self.rstate)
+            self.rstate = []
+        if self.roffset:
+            self.cur.executemany("""insert or replace into rowoffset (docid, offset) values (?,?)""", self.roffset)
+            self.roffset = []
+        self.metrics.add_phase("insert", time()-_t)
+        _t = time()
+        self.con.commit()
+        self._time = time()
+        self.metrics.add_phase("commit", self._time-_t)
+        self.flush_time += self._time-_start
+    
+    # merges the segments of the full text index at the end of the indexing
+    def optimize(self):
+        self.flush()
+        _t = time()
+        if INDEXER_OPTIMIZE == 1:
+            # merge until no more work is done
+            while True:
+                _changes = self.con.total_changes
+                self.cur.execute("""insert into tabella(tabella) values('merge=300,8')""")
+                self.con.commit()
+                if self.con.total_changes - _changes < 2:
+                    break
+        elif INDEXER_OPTIMIZE == 2:
+            self.cur.execute("""insert into tabella(tabella) values('optimize')""")
+            self.con.commit()
+        self.metrics.add_phase("merge", time()-_t)
+        # the write-ahead log emptied at the end of the indexing
+        checkpoint(self.con, "TRUNCATE")
+    
+# limits the files and the bytes processed per second, and waits while the system is busy
+class ioThrottle:
+    # _stopped: returns True when the indexing is stopping, the pauses end
+    def __init__(self, _enabled, _stopped):
+        self._enabled = _enabled
+        self._stopped = _stopped
+        # from when the files and the bytes are counted
+        self._fstart = self._bstart = time()
+        self._files = 0
+        self._bytes = 0
+        # when the system load has been checked last time
+        self._lcheck = 0
+        # the previous iowait and total cpu times
+        self._cpu = self.cpu_times()
     
+    # a file is going to be extracted
+    def file(self):
+        if not self._enabled:
+            return
+        self._files += 1
+        if INDEXER_MAX_FILES > 0:
+            self._fstart = self.wait_for(self._fstart, self._files/INDEXER_MAX_FILES)
+        self.check_load()
+    
+    # _size bytes are going to be read
+    def read(self, _size):
+        if not self._enabled:
+            return
+        self._bytes += _size
+        if INDEXER_MAX_BYTES > 0:
+            self._bstart = self.wait_for(self._bstart, self._bytes/INDEXER_MAX_BYTES)
+    
+    # sleeps until _sec seconds have passed from _start, or the indexing is stopping;
+    # _start is moved forward not to be behind by more than THROTTLE_BURST seconds, and returned
+    def wait_for(self, _start, _sec):
+        _start = max(_start, time()-_sec-THROTTLE_BURST)
+        _delay = _start+_sec-time()
+        while _delay > 0 and not self._stopped():
+            sleep(min(_delay, INDEXER_PAUSE))
+            _delay = _start+_sec-time()
+        return _start
+    
+    # iowait and total cpu times from /proc/stat
+    def cpu_times(self):
+        try:
+            with open("/proc/stat", "r") as _f:
+                _cpu = _f.readline().split()[1:]
+            return int(_cpu[4]), sum(int(el) for el in _cpu)
+        except:
+            return None
+    
+    # the percentage of time spent waiting for i/o since the last check
+    def iowait(self):
+        _cpu = self.cpu_times()
+        _old = self._cpu
+        self._cpu = _cpu
+        if _cpu == None or _old == None or _cpu[1] == _old[1]:
+            return 0
+        return (_cpu[0]-_old[0])*100/(_cpu[1]-_old[1])
+    
+    def is_busy(self):
+        if INDEXER_MAX_LOAD > 0 and os.getloadavg()[0] > INDEXER_MAX_LOAD:
+            return True
+        if INDEXER_MAX_IOWAIT > 0 and self.iowait() > INDEXER_MAX_IOWAIT:
+            return True
+        return False
+    
+    # pauses while the system is busy, checked once every INDEXER_PAUSE seconds
+    def check_load(self):
+        if time()-self._lcheck < INDEXER_PAUSE:
+            return
+        _paused = time()
+        while not self._stopped() and self.is_busy():
+            sleep(INDEXER_PAUSE)
+        self._lcheck = time()
+        # the pause does not count for the limits
+        self._fstart += self._lcheck-_paused
+        self._bstart += self._lcheck-_paused
+
 class vvar:
-    def __init__(self):
+    def __init__(self, unthrottled=False):
         # how many files have been processed
         self.ii = 0
         # how many files have been added
@@ -53,10 +430,6 @@ class vvar:
         self.METADATA = ""
         # special tag1
         self.TAG1=""
-        # list of files ready to be indexed, only name
-        self.list_file = []
-        # list of processed files with path
-        self.pfiles = []
         # lfolder - folders to get indexed with absolute path
         # self.lfolder = []
         # self.lfolder = [os.path.join(main_dir,"test_folder")]
@@ -65,18 +438,44 @@ class vvar:
         self.lffolder = []
         # date and time
         self.ddatettime = strftime("%Y %b %d %H:%M:%S", gmtime())
-        # where to store the extractor plugins
-        self.ePlugins = []
-        # # imported modules 
-        # self.extractor_objmodule = []
-        # the mimetype of each module as they are loaded
-        self.extractor_mimmodule = []
-        # list of extractors
-        self.extractors = []
+        # the extractors of each mimetype, imported when used
+        self.registry = extractorRegistry()
+        # mimetypes of the files whose new content is indexed from where the previous indexing stopped
+        self.append_mime = self.registry.append_mime
+        # throughput of each process doing the extraction: pid: [files, seconds]
+        self.wstats = {}
+        # the pool of processes doing the extraction
+        self.pool = None
+        # called with each folder found while indexing
+        self.onfolder = None
+        # daemon mode: inotify watches and when to stop
+        self.watcher = None
+        self.stop = False
+        # progress events in stderr, for the main program: when the last one has been written, files extracted, start
+        self.progress = False
+        self.progress_time = 0
+        self.extracted = 0
+        self.start_time = time()
+        # the time spent in each phase and by each extractor
+        self.metrics = indexerMetrics()
 
-        # connecting to the database
-        self.con = sqlite3.connect(DATABASE)
+        # the docids are assigned by this process: no other indexer may write into the database
+        self.lock = lock_database(DATABASE)
+        # connecting to the database, migrated to the current schema
+        self.con = open_database(DATABASE)
         self.cur = self.con.cursor()
+        # the files found in this run, the others are deleted from the database
+        self.cur.execute("""create temp table seenfiles (dir TEXT, name TEXT, PRIMARY KEY(dir, name)) WITHOUT ROWID""")
+        # the folder whose file states are in self.fstate
+        self.fstate_dir = None
+        # name: (mtime, size, docids, resume, resumesum)
+        self.fstate = {}
+        # (device, inode) of the files whose mimetype has been read in this scan, the others are deleted from mimecache
+        self.seen_inodes = set()
+        # all the writes into the database
+        self.writer = dbWriter(self.con, self.metrics)
+        # the limits of the resources used
+        self.throttle = ioThrottle(INDEXER_THROTTLE == 1 and not unthrottled, lambda: self.stop)
         ### the dir of the main program
         # main_dir = os.getcwd()
         ##### create or populate the log files
@@ -87,113 +486,102 @@ class vvar:
             self.flogadd = open(os.path.join(main_dir, "LOGS", "file_added.log"),"w")
         # os.chdir(main_dir)
         ####
-        # import the extractor plugins
-        # sys.path.append(main_dir+'/'+'extractors/')
-        # module_dir = "extractors/"
-        module_dir = os.path.join(main_dir, "extractors")
+        # the extractors imported in this process
         sys.path.append(module_dir)
-        #
-        os.chdir(module_dir)
-        #
-        self.ePlugins = glob.glob('*.py')
-        #
-        #aa = 0
-        #for asd in self.ePlugins:
-        for _i,_comm in enumerate(self.ePlugins):
-            mmodule = os.path.splitext(self.ePlugins[_i])[0]
-            # mmodule = os.path.join(main_dir, "extractors", os.path.splitext(_comm)[0])
-            try:
-                ee = importlib.import_module(mmodule)
-                # self.extractor_objmodule.append(ee)
-                self.extractor_mimmodule.append(ee.docType)
-                self.extractors.append([ee,ee.docType])
-            except ImportError as ioe:
-                if INDEXER_LOG == 1:
-                    self.flog.write("{} Module {} failed to be imported.".format(self.ddatettime, ee))
-                pass
-            #aa += 1
-        #
-        os.chdir(main_dir)
-    
-    # creates the list of the files to be indexed
-    def execute_indexing(self, folder_to_index):
-        if (Path(folder_to_index).exists() == True) and (os.access(folder_to_index, os.R_OK) == True):
-            os.chdir(folder_to_index)
-            self.list_file = glob.glob("*")
-            llist_file = self.list_file[:]
-            for ffile in self.list_file:
-                sleep(0.1)
-                if not os.path.isfile(ffile):
-                    llist_file.remove(ffile)
-                    continue
-                #
-                _temp_iiiii = self.iiiii
-                try:
-                    pathfile = folder_to_index+"/"+ffile
-                    if (Path(folder_to_index).exists()) and (os.access(pathfile, os.R_OK)):
-                        file_magic = magic.detect_from_filename(ffile)[0]
-                        #
-                        self.ii += 1
-                        self.pfiles.append(folder_to_index+"/"+ffile)
-                        #
-                        _is_found = 0
-                        for el in self.extractor_mimmodule:
-                            if file_magic in el:
-                                _is_found = 1
-                                break
-                        # remove unhandled files
-                        if _is_found == 0:
-                            llist_file.remove(ffile)
-                            if INDEXER_LOG == 1:
-                                self.flogd.write("{} File discharged for wrong mimetype: {} in {}\n".format(self.ddatettime, ffile, folder_to_index))
-                            self.iiiii += 1
-                        # processing
-                        else:
-                            mmtime = os.stat(ffile).st_mtime
-                            self.cur.execute("""select mtime from tabella where name=(?) and dir=(?)""", (ffile, folder_to_index))
-                            mtcontent = self.cur.fetchone()
-                            if mtcontent == None:
-                                fmtime = 0
-                            else:
-                                fmtime = mtcontent[0]
-                            # remove files not changed from previous processing
-                            if mmtime == fmtime:
-                                llist_file.remove(ffile)
-                            elif fmtime == 0:
-                                pass
-                            # remve files to be reindexed
-                            elif mmtime > fmtime:
-                                self.cur.execute("""delete from tabella where name=(?) and dir=(?)""", (ffile,folder_to_index))
-                                self.con.commit()
-                                if INDEXER_LOG == 1:
-                                    self.flog.write("{} File updated: {} in {}\n".format(self.ddatettime, ffile, folder_to_index))
-                    else:
-                        # remove files caused issues while indexing
-                        llist_file.remove(ffile)
-                        if INDEXER_LOG == 1:
-                            self.flogd.write("{} File discharged for issue during indexing: {} in {}\n".format(self.ddatettime, ffile, folder_to_index))
-                        self.iiiiii += 1
-                except Exception as E:
-                    if INDEXER_LOG == 1:
-                        self.flogd.write("{} File discharged: {} in {} - Reason: {}\n".format(self.ddatettime, ffile, folder_to_index, str(E)))
-                    self.iiiii = _temp_iiiii+1
+    
+    # yields the files to be indexed in a folder and its subfolders: (folder, file, stat, mimetype, offset, docids)
+    def execute_indexing(self, folder_to_index, _depth=0, _visited=None):
+        if os.access(folder_to_index, os.R_OK) == True:
+            for (_folder, _entry) in self.metrics.timed("walk", walk_folder(folder_to_index, self.walk_error, self.onfolder, _depth, _visited)):
+                # stat cached by the directory entry
+                _ret = self.check_file(_folder, _entry.name, _entry.path, _entry.stat)
+                if _ret != None:
+                    yield _ret
         else:
             self.FFOLDER_NOT += 1
             if INDEXER_LOG == 1:
                 self.flog.write("{} Folder issue during indexing: {}\n".format(self.ddatettime, folder_to_index))
             self.iiiiii += 1
+    
+    # returns (folder, file, stat, mimetype, offset, docids) if the file is new or changed, otherwise None;
+    # offset and docids: where the new content starts and the rows already stored, if only the new content is indexed
+    def check_file(self, _folder, ffile, pathfile, _fstat):
         #
-        # return llist_file,mmbox_file
-        return llist_file
-    
-    # the name of all files stored
-    def all_name_file(self):
-        cname = []
-        self.cur.execute("select name,dir from tabella")
-        cname1 = self.cur.fetchall()
-        for aa in cname1:
-            cname.append(aa[1]+"/"+aa[0])
-        return cname
+        _temp_iiiii = self.iiiii
+        # the writes into the database are not counted in these phases
+        _t = time()
+        _flush = self.writer.flush_time
+        try:
+            if os.access(pathfile, os.R_OK):
+                _stat = _fstat()
+                file_magic = self.get_mime(pathfile, _stat)
+                self.metrics.add_phase("mime", time()-_t-(self.writer.flush_time-_flush))
+                _t = time()
+                _flush = self.writer.flush_time
+                #
+                self.ii += 1
+                self.writer.seen(_folder, ffile)
+                self.report_progress(pathfile)
+                #
+                # remove unhandled files
+                if not self.registry.candidates(file_magic):
+                    if INDEXER_LOG == 1:
+                        self.flogd.write("{} File discharged for wrong mimetype: {} in {}\n".format(self.ddatettime, ffile, _folder))
+                    self.iiiii += 1
+                # processing
+                else:
+                    _state = self.folder_state(_folder).get(ffile)
+                    # skip files not changed from previous processing, and completely indexed
+                    if _state != None and _state[0] == _stat.st_mtime and _state[1] in (None, _stat.st_size) and (_state[3] == None or _state[3] >= _stat.st_size):
+                        return None
+                    elif _state != None:
+                        # only the content added to the file is indexed, if the part already indexed is not changed
+                        if file_magic in self.append_mime and _state[3] != None and _stat.st_size >= _state[3] and resume_checksum(pathfile, _state[3]) == _state[4]:
+                            if INDEXER_LOG == 1:
+                                self.flog.write("{} File appended: {} in {}\n".format(self.ddatettime, ffile, _folder))
+                            return (_folder, ffile, _stat, file_magic, _state[3], _state[2])
+                        # remove files to be reindexed
+                        self.writer.delete_docids(_state[2])
+                        if INDEXER_LOG == 1:
+                            self.flog.write("{} File updated: {} in {}\n".format(self.ddatettime, ffile, _folder))
+                    return (_folder, ffile, _stat, file_magic, 0, "")
+            else:
+                # skip files caused issues while indexing
+                if INDEXER_LOG == 1:
+                    self.flogd.write("{} File discharged for issue during indexing: {} in {}\n".format(self.ddatettime, ffile, _folder))
+                self.iiiiii += 1
+        except Exception as E:
+            if INDEXER_LOG == 1:
+                self.flogd.write("{} File discharged: {} in {} - Reason: {}\n".format(self.ddatettime, ffile, _folder, str(E)))
+            self.iiiii = _temp_iiiii+1
+        finally:
+            self.metrics.add_phase("change", time()-_t-(self.writer.flush_time-_flush))
+        return None
+    
+    # the stored states of the files in _folder, read all together
+    def folder_state(self, _folder):
+        if _folder != self.fstate_dir:
+            self.cur.execute("""select name, mtime, size, docids, resume, resumesum from filestate where dir=(?)""", (_folder,))
+            self.fstate = {el[0]: el[1:] for el in self.cur.fetchall()}
+            self.fstate_dir = _folder
+        return self.fstate
+    
+    # the mimetype from the cache or from libmagic
+    def get_mime(self, pathfile, _stat):
+        self.seen_inodes.add((_stat.st_dev, _stat.st_ino))
+        self.cur.execute("""select size, mtime, mime from mimecache where dev=(?) and ino=(?)""", (_stat.st_dev, _stat.st_ino))
+        _cached = self.cur.fetchone()
+        if _cached != None and _cached[0] == _stat.st_size and _cached[1] == _stat.st_mtime:
+            return _cached[2]
+        file_magic = magic.detect_from_filename(pathfile)[0]
+        self.writer.cache_mime((_stat.st_dev, _stat.st_ino, _stat.st_size, _stat.st_mtime, file_magic))
+        return file_magic
+    
+    # a subfolder cannot be read
+    def walk_error(self, _folder, E):
+        if INDEXER_LOG == 1:
+            self.flog.write("{} Folder issue during indexing: {} - Reason: {}\n".format(self.ddatettime, _folder, str(E)))
+        self.iiiiii += 1
     
     # checks if folders exist
     def check_ffolder(self):
@@ -208,67 +596,380 @@ class vvar:
                 self.FFOLDER_NOT += 1
                 if INDEXER_LOG == 1:
                     self.flog.write("{} Folder not found: {}\n".format(self.ddatettime, ffolder))
+        # path_list.cfg may list a folder and its subfolders: the subfolders first, indexed to their full depth,
+        # then skipped while walking the folders containing them
+        self.lffolder.sort(key=lambda el: el.rstrip("/").count("/"), reverse=True)
     
-    # indexing process
+    # indexing process: stopped by SIGTERM after the last transaction
     def ins_db(self):
+        signal.signal(signal.SIGTERM, self.on_stop)
         self.check_ffolder()
-        for folder_to_index in self.lffolder:
-            #
-            flist_file = self.execute_indexing(folder_to_index)
-            if flist_file != []:
-                for fti in flist_file:
-                    mmtime = os.stat(fti).st_mtime
-                    fmime = magic.detect_from_filename(fti)[0]
-                    #nmod = self.extractor_mimmodule.index(fmime)
-                    # obj = self.extractor_objmodule[nmod]
-                    obj = None
-                    #
-                    for ell in self.extractors:
-                        # if fmime in ell[1] and ell[0].fidentify != "mbox":
-                        if fmime in ell[1]:
-                            obj = ell[0]
-                            break
-                    # maybe redundant
-                    if obj == None:
-                        if INDEXER_LOG == 1:
-                            self.flogd.write("{} File discharged for no content: {} in {}\n".format(self.ddatettime, fti, folder_to_index))
-                        self.iiiii += 1
-                        return
-                    #
-                    freturn = obj.ffile_content(folder_to_index+"/"+fti)
-                    if freturn == False:
-                        if INDEXER_LOG == 1:
-                            self.flogd.write("{} File discharged for no content: {} in {}\n".format(self.ddatettime, fti, folder_to_index))
-                        self.iiiii += 1
-                        pass
-                    else:
-                        for el in freturn:
-                            self.iii += 1
-                            # self.METADATA = freturn[0]
-                            _METADATA = el[0]
-                            ccontent = el[1]
-                            # self.TAG1 = freturn[2]
-                            _TAG1 = el[2]
-                            # self.cur.execute("""insert into tabella (name, mime, mtime, dir, content, metadata, tag1) values (?,?,?,?,?,?,?)""", (fti, fmime, mmtime, folder_to_index, ccontent, self.METADATA, self.TAG1))
-                            self.cur.execute("""insert into tabella (name, mime, mtime, dir, content, metadata, tag1) values (?,?,?,?,?,?,?)""", (fti, fmime, mmtime, folder_to_index, ccontent, _METADATA, _TAG1))
-                            self.con.commit()
-                            if INDEXER_LOG == 1:
-                                self.flogadd.write("{} File added: {} in {}\n".format(self.ddatettime, fti, folder_to_index))
+        self.scan_all()
+        self.close_pool()
+        if self.stop:
+            self.writer.flush()
+            checkpoint(self.con, "TRUNCATE")
+        else:
+            self.writer.optimize()
+        self.report_progress("", True)
+    
+    # indexes all the folders and deletes the files not found
+    def scan_all(self):
+        self.seen_inodes = set()
+        self.run_jobs(self.list_jobs(self.list_files()))
+        self.worker_stats()
+        self.writer.flush()
+        # not all the files have been seen
+        if self.stop:
+            return
         # delete deleted files
         self.delete_notfile_row()
     
-    # deletes the related row if file is accessible no more
-    def delete_notfile_row(self):
-        cname = self.all_name_file()
-        for fname in cname:
-            if fname not in self.pfiles:
-                self.iiii += 1
-                (rfolder_to_index, rfile) = os.path.split(fname)
-                self.cur.execute("""delete from tabella where name=(?) and dir=(?)""", (rfile, rfolder_to_index))
-                self.con.commit()
+    # a progress event as a line of json in stderr, at most one every INDEXER_PROGRESS seconds:
+    # files scanned, extracted, skipped, the last file and the files extracted per second
+    def report_progress(self, _file, _force=False):
+        if not self.progress or (not _force and time()-self.progress_time < INDEXER_PROGRESS):
+            return
+        self.progress_time = time()
+        _elapsed = self.progress_time-self.start_time
+        _event = {"scanned": self.ii, "extracted": self.extracted, "skipped": self.iiiii, "file": _file,
+                  "rate": round(self.extracted/_elapsed, 2) if _elapsed > 0 else 0, "stopped": self.stop}
+        sys.stderr.write(json.dumps(_event)+"\n")
+        sys.stderr.flush()
+    
+    # the files to be indexed in all the folders, each folder once
+    def list_files(self):
+        _visited = set()
+        for folder_to_index in self.lffolder:
+            yield from self.execute_indexing(folder_to_index, 0, _visited)
+    
+    def run_jobs(self, _jobs):
+        if INDEXER_WORKERS > 1:
+            self.run_jobs_pool(_jobs)
+        else:
+            for _job in _jobs:
+                # the next part of the file, if any
+                while _job != None and not self.stop:
+                    _job = self.store_file(_extract_file(_job))
+    
+    # the extraction is done by a pool of processes, while only this one writes into the database;
+    # a process dying (killed, or crashed by a library) breaks the pool: a new pool is started and the jobs
+    # lost are sent again one at a time, so only the file which kills the process is discharged
+    def run_jobs_pool(self, _jobs):
+        _jobs = iter(_jobs)
+        _window = INDEXER_WORKERS*4
+        # jobs sent to the pool but not stored yet: future: (job, sent alone, pool)
+        _inflight = {}
+        # the next parts of the files, sent before the other jobs
+        _next = []
+        # the jobs lost with a broken pool
+        _lost = []
+        while not self.stop:
+            if self.pool == None:
+                self.pool = ProcessPoolExecutor(INDEXER_WORKERS, initializer=_init_worker, initargs=(module_dir,))
+            if _lost:
+                if not _inflight:
+                    self.send_job(_inflight, _lost.pop(0), True, _lost)
+            else:
+                while len(_inflight) < _window:
+                    _job = _next.pop(0) if _next else next(_jobs, None)
+                    if _job == None or not self.send_job(_inflight, _job, False, _lost):
+                        break
+            if not _inflight:
+                if _lost:
+                    continue
+                break
+            # not blocked if a process dies, and SIGTERM is checked
+            _done, _pending = wait(_inflight, timeout=POOL_POLL, return_when=FIRST_COMPLETED)
+            for _future in _done:
+                (_job, _alone, _pool) = _inflight.pop(_future)
+                try:
+                    _ret = _future.result()
+                except BrokenProcessPool:
+                    # the other jobs in the pool are lost too
+                    if _pool is self.pool:
+                        self.close_pool()
+                    if not _alone:
+                        _lost.append(_job)
+                        continue
+                    _ret = None
+                except Exception:
+                    _ret = None
+                _job = self.store_file(_ret)
+                if _job != None:
+                    _next.append(_job)
+    
+    # sends a job to the pool, into _lost if the pool is already broken
+    def send_job(self, _inflight, _job, _alone, _lost):
+        try:
+            _inflight[self.pool.submit(_extract_file, _job)] = (_job, _alone, self.pool)
+            return True
+        except BrokenProcessPool:
+            self.close_pool()
+            _lost.insert(0, _job)
+            return False
+    
+    # the jobs not started yet are discarded; after SIGTERM the extractions running are not waited for
+    def close_pool(self):
+        if self.pool != None:
+            if self.stop:
+                for el in list((self.pool._processes or {}).values()):
+                    el.terminate()
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+    
+    # the jobs for the files to be indexed: (modules, folder, file, mimetype, mtime, size, inode, offset, docids)
+    def list_jobs(self, _files):
+        for (_folder, fti, _stat, fmime, _offset, _docids) in _files:
+            # no more files after SIGTERM
+            if self.stop:
+                return
+            mmtime = _stat.st_mtime
+            # only the files read count for the limits, not those unchanged
+            self.throttle.file()
+            self.throttle.read(_stat.st_size)
+            _modules = self.registry.candidates(fmime)
+            # maybe redundant
+            if not _modules:
                 if INDEXER_LOG == 1:
-                    self.flog.write("{} File deleted from database because the folder doesn't exist anymore': {} in {}\n".format(self.ddatettime, rfile, rfolder_to_index))
-        
+                    self.flogd.write("{} File discharged for no content: {} in {}\n".format(self.ddatettime, fti, _folder))
+                self.iiiii += 1
+                continue
+            #
+            yield (_modules, _folder, fti, fmime, mmtime, _stat.st_size, _stat.st_ino, _offset, _docids)
+    
+    # stores the data extracted from a file, returns the job for the next part of the file if any
+    def store_file(self, _ret):
+        # the worker process failed
+        if _ret == None:
+            self.iiiii += 1
+            self.metrics.worker_errors += 1
+            return None
+        _pid, _job, freturn, _elapsed, _truncated, _more, _resume, _sum, _attempts = _ret
+        _wstat = self.wstats.setdefault(_pid, [0, 0])
+        _wstat[0] += 1
+        _wstat[1] += _elapsed
+        (_module, folder_to_index, fti, fmime, mmtime, _size, _ino, _offset, _olddocids) = _job
+        self.extracted += 1
+        self.report_progress(os.path.join(folder_to_index, fti))
+        # with a pool, the time of all the processes
+        self.metrics.add_phase("extract", _elapsed)
+        for (_name, _sec, _error) in _attempts:
+            self.metrics.add_extraction(_name, fmime, _sec, _error)
+        if freturn != False:
+            self.metrics.add_volume(_module[0], fmime, (_resume if _resume != None else _size)-_offset, sum(len(el[1]) for el in freturn))
+        _docids = [el for el in _olddocids.split(",") if el != ""]
+        # nothing new in a file indexed in parts
+        if freturn == False and _offset > 0:
+            pass
+        elif freturn == False:
+            if INDEXER_LOG == 1:
+                self.flogd.write("{} File discharged for no content: {} in {}\n".format(self.ddatettime, fti, folder_to_index))
+            self.iiiii += 1
+        else:
+            for el in freturn:
+                self.iii += 1
+                _METADATA = el[0]
+                ccontent = el[1]
+                _TAG1 = el[2]
+                _docid = self.writer.insert((fti, fmime, mmtime, folder_to_index, ccontent, _METADATA, _TAG1))
+                _docids.append(str(_docid))
+                if len(el) > 3:
+                    self.writer.store_offset(_docid, el[3])
+                if INDEXER_LOG == 1:
+                    self.flogadd.write("{} File added: {} in {}\n".format(self.ddatettime, fti, folder_to_index))
+        if _truncated and INDEXER_LOG == 1:
+            self.flog.write("{} File truncated to {} bytes: {} in {}\n".format(self.ddatettime, INDEXER_MAX_DOC_BYTES, fti, folder_to_index))
+        # also the files without content, not to extract them again if not changed
+        self.writer.store_state((folder_to_index, fti, mmtime, _size, _ino, fmime, ",".join(_docids), int(_truncated), _resume, _sum))
+        if _more:
+            return (_module, folder_to_index, fti, fmime, mmtime, _size, _ino, _resume, ",".join(_docids))
+        return None
+    
+    # throughput of each extracting process, not in stdout which is read by the main program
+    def worker_stats(self):
+        for _pid in self.wstats:
+            _files, _sec = self.wstats[_pid]
+            _rate = _files/_sec if _sec > 0 else 0
+            _msg = "Worker {}: {} files in {:.2f} s ({:.2f} files/s)\n".format(_pid, _files, _sec, _rate)
+            sys.stderr.write(_msg)
+            if INDEXER_LOG == 1:
+                self.flog.write("{} {}".format(self.ddatettime, _msg))
+    
+    # deletes the rows of the files not found, also those in folders no more in path_list.cfg
+    def delete_notfile_row(self):
+        _t = time()
+        _rows = 0
+        self.writer.flush()
+        self.cur.execute("""select dir, name, docids from filestate where not exists (select 1 from seenfiles where seenfiles.dir=filestate.dir and seenfiles.name=filestate.name)""")
+        for (rfolder_to_index, rfile, _docids) in self.cur.fetchall():
+            self.iiii += 1
+            _rows += len(_docids.split(",")) if _docids != "" else 0
+            self.writer.delete_docids(_docids)
+            self.writer.delete_state(rfolder_to_index, rfile)
+            if INDEXER_LOG == 1:
+                self.flog.write("{} File deleted from database because the file or the folder doesn't exist anymore: {} in {}\n".format(self.ddatettime, rfile, rfolder_to_index))
+        # the rows of no file, e.g. of the files indexed twice by the older versions
+        self.cur.execute("""select docids from filestate""")
+        _docids = set()
+        for (el,) in self.cur.fetchall():
+            _docids.update(int(_docid) for _docid in (el or "").split(",") if _docid != "")
+        self.cur.execute("""select docid from files""")
+        for (_docid,) in self.cur.fetchall():
+            if _docid not in _docids:
+                _rows += 1
+                self.writer.delete_docids(str(_docid))
+        # the mimetypes of the files no more found, or replaced by others
+        self.cur.execute("""select dev, ino from mimecache""")
+        self.cur.executemany("""delete from mimecache where dev=(?) and ino=(?)""", [el for el in self.cur.fetchall() if el not in self.seen_inodes])
+        self.writer.flush()
+        # not in stdout which is read by the main program
+        _msg = "Deleted {} files ({} rows) in {:.2f} s\n".format(self.iiii, _rows, time()-_t)
+        sys.stderr.write(_msg)
+        if INDEXER_LOG == 1:
+            self.flog.write("{} {}".format(self.ddatettime, _msg))
+    
+    # daemon mode: the folders are indexed once, then only the files changed, as notified by inotify
+    def _daemon(self):
+        import indexerwatch
+        self.watcher = indexerwatch.inotifyWatcher()
+        self.onfolder = self.watch_folder
+        signal.signal(signal.SIGTERM, self.on_stop)
+        signal.signal(signal.SIGINT, self.on_stop)
+        self.check_ffolder()
+        self.scan_all()
+        self.writer.optimize()
+        # path: mask of the last event, waiting to be processed
+        _pending = {}
+        _overflow = False
+        # when the first and the last of the waiting events happened
+        _first = _last = 0
+        while not self.stop:
+            _events = self.watcher.read_events(INDEXER_DEBOUNCE)
+            _now = time()
+            for (_path, _mask) in _events:
+                if _path == None:
+                    _overflow = True
+                    continue
+                _pending[_path] = _mask
+                # folders moved or deleted are watched no more
+                if (_mask & (indexerwatch.IN_DELETE_SELF | indexerwatch.IN_MOVE_SELF)) or ((_mask & indexerwatch.IN_ISDIR) and (_mask & (indexerwatch.IN_MOVED_FROM | indexerwatch.IN_DELETE))):
+                    self.watcher.remove_tree(_path)
+            if _events:
+                if _first == 0:
+                    _first = _now
+                _last = _now
+            # waits until no events for INDEXER_DEBOUNCE seconds, but not more than INDEXER_DEBOUNCE_MAX
+            if _first == 0 or (_now-_last < INDEXER_DEBOUNCE and _now-_first < INDEXER_DEBOUNCE_MAX):
+                continue
+            # some events have been lost: everything is checked again
+            if _overflow:
+                self.writer.flush()
+                self.cur.execute("""delete from seenfiles""")
+                self.fstate_dir = None
+                self.scan_all()
+            else:
+                self.update_paths(_pending)
+            checkpoint(self.con)
+            self.write_metrics()
+            _pending = {}
+            _overflow = False
+            _first = _last = 0
+        self.close_pool()
+        self.writer.flush()
+        checkpoint(self.con, "TRUNCATE")
+        self.watcher.close()
+    
+    def on_stop(self, _signum, _frame):
+        self.stop = True
+    
+    def watch_folder(self, _folder):
+        if _folder in self.watcher.folders:
+            return
+        try:
+            self.watcher.add_watch(_folder)
+        except OSError as E:
+            # e.g. too many watches, see /proc/sys/fs/inotify/max_user_watches
+            self.walk_error(_folder, E)
+    
+    # indexes the files and folders changed, deletes those no more existing
+    def update_paths(self, _paths):
+        _t = time()
+        _deleted = self.iiii
+        _added = self.iii
+        self.writer.flush()
+        # the states changed since they were read
+        self.fstate_dir = None
+        _files = []
+        # the folders indexed with all their content
+        _folders = []
+        for _path in sorted(_paths):
+            _depth = self.path_depth(_path)
+            if _depth == None:
+                continue
+            # already indexed with its folder
+            if any(_path.startswith(el+"/") for el in _folders):
+                continue
+            if os.path.isdir(_path):
+                # new folder or moved here
+                self.delete_path(_path)
+                if INDEXER_MAX_DEPTH < 0 or _depth <= INDEXER_MAX_DEPTH:
+                    _folders.append(_path)
+                    _files.append(self.execute_indexing(_path, _depth))
+            elif os.path.isfile(_path):
+                if INDEXER_INCLUDE != [] and not match_patterns(os.path.basename(_path), _path, INDEXER_INCLUDE):
+                    continue
+                (_folder, ffile) = os.path.split(_path)
+                _file = self.check_file(_folder, ffile, _path, lambda: os.stat(_path))
+                if _file != None:
+                    _files.append([_file])
+            else:
+                self.delete_path(_path)
+        # the states of the folders moved here are deleted before walking them, or their files,
+        # unchanged if they have been moved back, would be found already indexed
+        self.writer.flush()
+        self.fstate_dir = None
+        self.run_jobs(self.list_jobs(_file for el in _files for _file in el))
+        self.writer.flush()
+        _msg = "Updated {} paths: {} rows added, {} files deleted in {:.2f} s\n".format(len(_paths), self.iii-_added, self.iiii-_deleted, time()-_t)
+        sys.stderr.write(_msg)
+        if INDEXER_LOG == 1:
+            self.flog.write("{} {}".format(self.ddatettime, _msg))
+    
+    # the depth of _path from the folder in path_list.cfg containing it, None if not to be indexed
+    def path_depth(self, _path):
+        for ffolder in self.lffolder:
+            if _path.startswith(ffolder.rstrip("/")+"/"):
+                _parts = _path[len(ffolder.rstrip("/"))+1:].split("/")
+                for el in _parts:
+                    if match_patterns(el, _path, INDEXER_EXCLUDE):
+                        return None
+                return len(_parts)
+        return None
+    
+    # deletes a file, or all the files in a folder and its subfolders
+    def delete_path(self, _path):
+        (_folder, ffile) = os.path.split(_path)
+        # the folders from _path/ to _path0 (the character after /) are its subfolders
+        self.cur.execute("""select dir, name, docids from filestate where (dir=(?) and name=(?)) or dir=(?) or (dir>=(?) and dir<(?))""", (_folder, ffile, _path, _path+"/", _path+"0"))
+        for (rfolder_to_index, rfile, _docids) in self.cur.fetchall():
+            self.iiii += 1
+            self.writer.delete_docids(_docids)
+            self.writer.delete_state(rfolder_to_index, rfile)
+            if INDEXER_LOG == 1:
+                self.flog.write("{} File deleted from database because the file or the folder doesn't exist anymore: {} in {}\n".format(self.ddatettime, rfile, rfolder_to_index))
+    
+    # the metrics written in the format of INDEXER_METRICS, with the counters of the files
+    def write_metrics(self):
+        if INDEXER_METRICS not in METRICS_FILE:
+            return
+        _counters = {"files_processed": self.ii, "rows_added": self.iii, "files_deleted": self.iiii, "files_discharged": self.iiiii,
+                     "folders_missing": self.FFOLDER_NOT, "issues": self.iiiiii}
+        try:
+            self.metrics.write(METRICS_FILE[INDEXER_METRICS], INDEXER_METRICS, _counters)
+        except OSError as E:
+            sys.stderr.write("Metrics not written: {}\n".format(str(E)))
+    
     # return to the main program some data
     def return_file(self):
         llist = "{} {} {} {} {} {}".format(self.ii, self.iii, self.iiii, self.iiiii, self.FFOLDER_NOT, self.iiiiii)
@@ -281,11 +982,24 @@ class vvar:
         self.con.close()
         return llist
     
-    def _index(self):
-        self.ins_db()
+    def _index(self, daemon=False):
+        if daemon:
+            self._daemon()
+        else:
+            self.ins_db()
+        self.write_metrics()
         # self.delete_notfile_row()
         aaa = self.return_file()
         print(aaa)
 
-app = vvar()   
-app._index()
+if __name__ == "__main__":
+    # --unthrottled: no limits, e.g. the database is rebuilt from the main program
+    try:
+        app = vvar("--unthrottled" in sys.argv[1:])
+    except BlockingIOError:
+        sys.stderr.write("Another indexer is writing into {}\n".format(DATABASE))
+        sys.exit(LOCKED_EXIT)
+    # --progress: progress events in stderr
+    app.progress = "--progress" in sys.argv[1:]
+    # --daemon: keeps running and indexes the changed files
+    app._index("--daemon" in sys.argv[1:])
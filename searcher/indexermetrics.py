@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+# the metrics of the indexer: the seconds spent in each phase, the latency of the extraction
+# of each extractor and of each mimetype as histograms, with the errors, the bytes read
+# and the characters extracted; written as json or in the prometheus text format
+# (e.g. for the textfile collector of node_exporter)
+
+import os
+import json
+from time import time
+
+# the phases of the indexing
+PHASES = ("walk", "mime", "change", "extract", "insert", "delete", "commit", "merge")
+
+# the upper bounds of the buckets of the histograms, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# the latency of the extractions of an extractor or of a mimetype
+class latencyHistogram:
+    def __init__(self):
+        # extractions in each bucket, the last one for those slower than all the bounds
+        self.counts = [0]*(len(BUCKETS)+1)
+        self.sum = 0
+        self.count = 0
+        # the extractor raised an exception
+        self.errors = 0
+        # the size of the files, or of their part extracted
+        self.bytes_in = 0
+        # the characters of the text stored
+        self.chars_out = 0
+
+    def add(self, _sec):
+        for i in range(len(BUCKETS)):
+            if _sec <= BUCKETS[i]:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.sum += _sec
+        self.count += 1
+
+    # the cumulative counts, as in prometheus: (bound, count), the last bound is +Inf
+    def cumulative(self):
+        _ret = []
+        _total = 0
+        for (_bound, _count) in zip(BUCKETS+("+Inf",), self.counts):
+            _total += _count
+            _ret.append((_bound, _total))
+        return _ret
+
+    def to_dict(self):
+        return {"count": self.count, "sum": round(self.sum, 6), "errors": self.errors, "bytes_in": self.bytes_in,
+                "chars_out": self.chars_out, "buckets": [[str(_bound), _count] for (_bound, _count) in self.cumulative()]}
+
+# a label value in the prometheus text format
+def label_value(_value):
+    return str(_value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+class indexerMetrics:
+    def __init__(self):
+        self.start_time = time()
+        # phase: seconds
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        # name: latencyHistogram
+        self.extractors = {}
+        self.mimetypes = {}
+        # the worker processes of the pool failed, the extractor is unknown
+        self.worker_errors = 0
+
+    def add_phase(self, _phase, _sec):
+        self.phases[_phase] = self.phases.get(_phase, 0.0)+_sec
+
+    # yields the values of _gen, the time spent to get them goes into _phase
+    def timed(self, _phase, _gen):
+        _it = iter(_gen)
+        while True:
+            _t = time()
+            try:
+                _value = next(_it)
+            except StopIteration:
+                self.add_phase(_phase, time()-_t)
+                return
+            self.add_phase(_phase, time()-_t)
+            yield _value
+
+    # an extraction attempt by the extractor _module of a file of mimetype _mime
+    def add_extraction(self, _module, _mime, _sec, _error):
+        for _hist in (self.extractors.setdefault(_module, latencyHistogram()), self.mimetypes.setdefault(_mime, latencyHistogram())):
+            _hist.add(_sec)
+            if _error:
+                _hist.errors += 1
+
+    # the bytes of the file and the characters stored, for the extractor which extracted it
+    def add_volume(self, _module, _mime, _bytes, _chars):
+        for _hist in (self.extractors.setdefault(_module, latencyHistogram()), self.mimetypes.setdefault(_mime, latencyHistogram())):
+            _hist.bytes_in += _bytes
+            _hist.chars_out += _chars
+
+    # _counters: name: value, e.g. the files processed
+    def to_dict(self, _counters):
+        return {"start": self.start_time, "elapsed": round(time()-self.start_time, 6),
+                "phases": {el: round(self.phases[el], 6) for el in self.phases},
+                "extractors": {el: self.extractors[el].to_dict() for el in sorted(self.extractors)},
+                "mimetypes": {el: self.mimetypes[el].to_dict() for el in sorted(self.mimetypes)},
+                "worker_errors": self.worker_errors, "counters": dict(_counters)}
+
+    def to_prometheus(self, _counters):
+        _lines = []
+        _lines.append("# HELP searcher_indexer_elapsed_seconds Seconds since the indexer started.")
+        _lines.append("# TYPE searcher_indexer_elapsed_seconds gauge")
+        _lines.append("searcher_indexer_elapsed_seconds {:.6f}".format(time()-self.start_time))
+        _lines.append("# HELP searcher_indexer_phase_seconds_total Seconds spent in each phase of the indexing.")
+        _lines.append("# TYPE searcher_indexer_phase_seconds_total counter")
+        for el in self.phases:
+            _lines.append("searcher_indexer_phase_seconds_total{{phase=\"{}\"}} {:.6f}".format(label_value(el), self.phases[el]))
+        _lines.append("# HELP searcher_indexer_worker_errors_total Extractions lost because a worker process failed.")
+        _lines.append("# TYPE searcher_indexer_worker_errors_total counter")
+        _lines.append("searcher_indexer_worker_errors_total {}".format(self.worker_errors))
+        for (_label, _hists) in (("extractor", self.extractors), ("mime", self.mimetypes)):
+            _name = "searcher_indexer_{}".format(_label)
+            _lines.append("# HELP {}_extract_seconds Seconds of each extraction by {}.".format(_name, _label))
+            _lines.append("# TYPE {}_extract_seconds histogram".format(_name))
+            for el in sorted(_hists):
+                _value = label_value(el)
+                for (_bound, _count) in _hists[el].cumulative():
+                    _lines.append("{}_extract_seconds_bucket{{{}=\"{}\",le=\"{}\"}} {}".format(_name, _label, _value, _bound, _count))
+                _lines.append("{}_extract_seconds_sum{{{}=\"{}\"}} {:.6f}".format(_name, _label, _value, _hists[el].sum))
+                _lines.append("{}_extract_seconds_count{{{}=\"{}\"}} {}".format(_name, _label, _value, _hists[el].count))
+            for (_metric, _attr, _help) in (("extract_errors_total", "errors", "Extractions failed with an error"),
+                                            ("bytes_in_total", "bytes_in", "Bytes of the files extracted"),
+                                            ("chars_out_total", "chars_out", "Characters of text stored")):
+                _lines.append("# HELP {}_{} {} by {}.".format(_name, _metric, _help, _label))
+                _lines.append("# TYPE {}_{} counter".format(_name, _metric))
+                for el in sorted(_hists):
+                    _lines.append("{}_{}{{{}=\"{}\"}} {}".format(_name, _metric, _label, label_value(el), getattr(_hists[el], _attr)))
+        for el in _counters:
+            _lines.append("# TYPE searcher_indexer_{} gauge".format(el))
+            _lines.append("searcher_indexer_{} {}".format(el, _counters[el]))
+        return "\n".join(_lines)+"\n"
+
+    # written into a temporary file and renamed, the readers never find it half written;
+    # _format: 1 json - 2 prometheus
+    def write(self, _path, _format, _counters):
+        if _format == 2:
+            _data = self.to_prometheus(_counters)
+        else:
+            _data = json.dumps(self.to_dict(_counters), indent=1)+"\n"
+        os.makedirs(os.path.dirname(_path), exist_ok=True)
+        _tmp = _path+".tmp"
+        with open(_tmp, "w") as _f:
+            _f.write(_data)
+        os.replace(_tmp, _path)
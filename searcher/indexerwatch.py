@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+# inotify through ctypes, used by the indexer in daemon mode
+
+import os
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# events, as in sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# the events watched in each folder
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+# wd, mask, cookie, length of the name
+_EVENT = struct.Struct("iIII")
+
+class inotifyWatcher:
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            _err = ctypes.get_errno()
+            raise OSError(_err, os.strerror(_err))
+        # wd: folder
+        self.wds = {}
+        # folder: wd
+        self.folders = {}
+
+    def add_watch(self, _folder):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(_folder), WATCH_MASK)
+        if wd < 0:
+            _err = ctypes.get_errno()
+            raise OSError(_err, os.strerror(_err), _folder)
+        self.wds[wd] = _folder
+        self.folders[_folder] = wd
+
+    # removes the watches of a folder and its subfolders, e.g. moved elsewhere
+    def remove_tree(self, _folder):
+        for el in list(self.folders):
+            if el == _folder or el.startswith(_folder+"/"):
+                wd = self.folders.pop(el)
+                self.wds.pop(wd, None)
+                self._libc.inotify_rm_watch(self.fd, wd)
+
+    # waits the events up to _timeout seconds: returns a list of (path, mask);
+    # path is None if the kernel queue overflowed and some events have been lost
+    def read_events(self, _timeout):
+        _ready = select.select([self.fd], [], [], _timeout)[0]
+        if not _ready:
+            return []
+        _events = []
+        while True:
+            try:
+                _data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            _pos = 0
+            while _pos < len(_data):
+                wd, _mask, _cookie, _len = _EVENT.unpack_from(_data, _pos)
+                _name = _data[_pos+_EVENT.size:_pos+_EVENT.size+_len].rstrip(b"\0")
+                _pos += _EVENT.size+_len
+                if _mask & IN_Q_OVERFLOW:
+                    _events.append((None, _mask))
+                    continue
+                _folder = self.wds.get(wd)
+                if _mask & IN_IGNORED:
+                    # the watch has been removed by the kernel
+                    if _folder != None and self.folders.get(_folder) == wd:
+                        del self.folders[_folder]
+                    self.wds.pop(wd, None)
+                    continue
+                if _folder == None:
+                    continue
+                if _name:
+                    _events.append((os.path.join(_folder, os.fsdecode(_name)), _mask))
+                else:
+                    _events.append((_folder, _mask))
+        return _events
+
+    def close(self):
+        os.close(self.fd)
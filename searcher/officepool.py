@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# long running headless office instance used by the extractors of the office documents:
+# one instance for each process doing the extraction, with its own profile,
+# reached through a local pipe with uno; without uno (python3-uno) a process
+# is executed for each document, still with its own profile
+
+import os
+import shutil
+import atexit
+import signal
+import tempfile
+import threading
+import subprocess
+import multiprocessing.util
+from time import sleep, time
+from searchercfg import OFFICE_WORKER, OFFICE_MAX_DOCS, OFFICE_TIMEOUT
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    USE_UNO = 1
+except ImportError:
+    USE_UNO = 0
+
+# the office program
+OFFICE_COMMAND = "libreoffice"
+
+# the instance of this process
+_worker = None
+
+# the office instance is terminated if this process dies
+def _set_pdeathsig():
+    try:
+        import ctypes
+        # PR_SET_PDEATHSIG
+        ctypes.CDLL(None).prctl(1, signal.SIGTERM)
+    except:
+        pass
+
+def _prop(_name, _value):
+    _p = PropertyValue()
+    _p.Name = _name
+    _p.Value = _value
+    return _p
+
+class officeWorker:
+    def __init__(self):
+        # the process owning this instance
+        self.pid = os.getpid()
+        # the profile of this instance, so it does not conflict with other instances
+        self.profile = tempfile.mkdtemp(prefix="searcher_office_")
+        self.pipe = "searcher_office_{}".format(os.getpid())
+        self.proc = None
+        self.desktop = None
+        # documents converted by the running instance
+        self.docs = 0
+
+    def profile_url(self):
+        return "file://"+os.path.join(self.profile, "profile")
+
+    def start(self):
+        _comm = [OFFICE_COMMAND, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault", "--nolockcheck",
+                 "-env:UserInstallation="+self.profile_url(),
+                 "--accept=pipe,name={};urp;StarOffice.ComponentContext".format(self.pipe)]
+        self.proc = subprocess.Popen(_comm, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, preexec_fn=_set_pdeathsig)
+        _local = uno.getComponentContext()
+        _resolver = _local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", _local)
+        # the first start also creates the profile
+        _end = time()+OFFICE_TIMEOUT
+        while True:
+            try:
+                _ctx = _resolver.resolve("uno:pipe,name={};urp;StarOffice.ComponentContext".format(self.pipe))
+                break
+            except Exception:
+                if time() > _end or self.proc.poll() != None:
+                    self.stop()
+                    raise
+                sleep(0.5)
+        self.desktop = _ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", _ctx)
+        self.docs = 0
+
+    def stop(self):
+        if self.desktop != None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.proc != None:
+            try:
+                self.proc.wait(5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc = None
+
+    # the text of a document, as libreoffice --cat
+    def convert(self, ffile):
+        if self.proc == None or self.proc.poll() != None or self.docs >= OFFICE_MAX_DOCS:
+            self.stop()
+            self.start()
+        self.docs += 1
+        _ret = []
+        _thread = threading.Thread(target=self._convert, args=(ffile, _ret), daemon=True)
+        _thread.start()
+        _thread.join(OFFICE_TIMEOUT)
+        # the instance hangs: it is killed and started again with the next document
+        if _thread.is_alive():
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+            self.desktop = None
+            raise TimeoutError(ffile)
+        if isinstance(_ret[0], Exception):
+            raise _ret[0]
+        return _ret[0]
+
+    def _convert(self, ffile, _ret):
+        _out = os.path.join(self.profile, "out.txt")
+        _doc = None
+        try:
+            _doc = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(os.path.abspath(ffile)), "_blank", 0, (_prop("Hidden", True), _prop("ReadOnly", True)))
+            _doc.storeToURL(uno.systemPathToFileUrl(_out), (_prop("FilterName", "Text (encoded)"), _prop("FilterOptions", "UTF8")))
+            with open(_out, "r", encoding="utf-8", errors="replace") as _f:
+                _ret.append(_f.read())
+        except Exception as E:
+            _ret.append(E)
+        finally:
+            if _doc != None:
+                try:
+                    _doc.close(True)
+                except Exception:
+                    pass
+            if os.path.exists(_out):
+                os.unlink(_out)
+
+    # a process for each document, without uno
+    def cat(self, ffile):
+        _comm = [OFFICE_COMMAND, "-env:UserInstallation="+self.profile_url(), "--headless", "--cat", ffile]
+        return subprocess.check_output(_comm, universal_newlines=True, timeout=OFFICE_TIMEOUT)
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+def _close_worker():
+    global _worker
+    if _worker != None:
+        _worker.close()
+        _worker = None
+
+# the text of an office document
+def office_text(ffile):
+    global _worker
+    if OFFICE_WORKER == 0:
+        return subprocess.check_output([OFFICE_COMMAND, "--headless", "--cat", ffile], universal_newlines=True)
+    # also if inherited from the parent process
+    if _worker == None or _worker.pid != os.getpid():
+        _worker = officeWorker()
+        atexit.register(_close_worker)
+        # the processes of a pool do not execute the atexit functions
+        multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+    if USE_UNO == 1:
+        return _worker.convert(ffile)
+    return _worker.cat(ffile)
@@ -9,11 +9,18 @@ import sys,os
 import gi
 gi.require_version("Gdk", "4.0")
 gi.require_version('Gtk', '4.0')
-from gi.repository import Gdk,Gtk,Gio,GLib
+from gi.repository import Gdk,Gtk,Gio,GLib,GObject
 from gi.repository import GdkPixbuf
 from pathlib import Path
 import sqlite3
 import subprocess
+import threading
+import signal
+import json
+from searcherrank import register_functions, ranked_search, prefix_query
+from searchercache import queryCache, index_generation
+from searchersnippet import row_snippets
+from searcherdb import open_database, open_readonly, LOCKED_EXIT
 
 # program directory
 main_dir = os.getcwd()
@@ -36,6 +43,79 @@ ICON_ROUNDENESS = 1
 # 0: only after selected the item in the result list
 CONTEXTUAL_FETCH = 0 # only 0
 
+# the results and the previews of the searches already done
+query_cache = queryCache()
+
+# an item of the result list: _item is ['file_name', 'mimetype', 'FILE_PATH', ROWID];
+# the other fields are set when the item is shown the first time
+class resultItem(GObject.Object):
+    def __init__(self, _item):
+        super().__init__()
+        self._item = _item
+        self._ret = ""
+        self._name = ""
+        self._data1 = ""
+        self._offset = ""
+        self._label = None
+
+# runs the searches in a thread with its own read-only connection, so the window is not blocked:
+# a search still running is interrupted when a new one is requested
+class searchWorker:
+    def __init__(self, _callback):
+        # called in the main loop with (generation, text, results, error)
+        self.callback = _callback
+        # the number of the last search requested, and of the one running
+        self.generation = 0
+        self.running = 0
+        self.request = None
+        self.cond = threading.Condition()
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    # returns the number of the search
+    def search(self, _text):
+        with self.cond:
+            self.generation += 1
+            self.request = (self.generation, _text)
+            self.cond.notify()
+        return self.generation
+    
+    # the search running and the results waiting are discarded
+    def cancel(self):
+        with self.cond:
+            self.generation += 1
+            self.request = None
+    
+    def run(self):
+        con = open_readonly(_DATABASE)
+        register_functions(con)
+        # nonzero interrupts the query
+        con.set_progress_handler(lambda: int(self.running != self.generation), 1000)
+        cur = con.cursor()
+        while True:
+            with self.cond:
+                while self.request == None:
+                    self.cond.wait()
+                self.running, _text = self.request
+                self.request = None
+            _error = None
+            try:
+                _generation = index_generation(cur)
+                _results = query_cache.get(("search", _text), _generation)
+                if _results == None:
+                    _results = ranked_search(cur, _text, RESULT_TOP_K)
+                    query_cache.put(("search", _text), _results, _generation)
+            except sqlite3.OperationalError as E:
+                # interrupted by a newer search
+                if self.running != self.generation:
+                    continue
+                # e.g. a wrong search syntax
+                _results = []
+                _error = str(E)
+            except Exception as E:
+                _results = []
+                _error = str(E)
+            GLib.idle_add(self.callback, self.running, _text, _results, _error)
+
 class MainWindow(Gtk.ApplicationWindow):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -71,6 +151,13 @@ class MainWindow(Gtk.ApplicationWindow):
         self.btn_box = Gtk.Box.new(0,0)
         self.main_vertical_box.append(self.btn_box)
         
+        # why the last search failed
+        self.error_label = Gtk.Label()
+        self.error_label.set_name("errorlbl")
+        self.error_label.set_wrap(True)
+        self.error_label.set_visible(False)
+        self.main_vertical_box.append(self.error_label)
+        
         self.main_entry = Gtk.SearchBar.new()
         self.main_entry.set_hexpand(True)
         self.btn_box.append(self.main_entry)
@@ -82,7 +169,7 @@ class MainWindow(Gtk.ApplicationWindow):
         self.main_entry.set_child(self._entry)
         # self.main_entry.connect_entry(self._entry)
         
-        # self._entry.connect('changed', self.on_changed)
+        self._entry.connect('changed', self.on_changed)
         self._entry.connect('activate', self.on_activate)
         self._entry.connect('icon-release', self.on_icon_pressed)
         
@@ -101,17 +188,38 @@ class MainWindow(Gtk.ApplicationWindow):
         # self.scroll.set_propagate_natural_width(True)
         # self.scroll_win.set_propagate_natural_height(True)
         
-        self.list_box = Gtk.ListBox.new()
-        self.list_box.set_vexpand(True)
+        # the results: the rows are built only for the visible items, and reused while scrolling
+        self.list_store = Gio.ListStore(item_type=resultItem)
+        _factory = Gtk.SignalListItemFactory()
+        _factory.connect('setup', self.on_item_setup)
+        _factory.connect('bind', self.on_item_bind)
+        self.list_view = Gtk.ListView.new(Gtk.NoSelection.new(self.list_store), _factory)
+        self.list_view.set_vexpand(True)
         if USE_APPS == 1:
-            self.list_box.set_activate_on_single_click(True)
-            self.list_box.connect('row-activated', self.on_list_box)
-        self.scroll_win.set_child(self.list_box)
+            self.list_view.set_single_click_activate(True)
+            self.list_view.connect('activate', self.on_list_view)
+        self.scroll_win.set_child(self.list_view)
+        # the next page of results when the end of the list is reached
+        self.scroll_win.connect('edge-reached', self.on_edge_reached)
+        # the text searched, the best results and how many are in the list
+        self.search_text = ""
+        self.results = []
+        self.loaded = 0
+        # the searches, while typing after a pause
+        self.worker = searchWorker(self.on_results)
+        self.search_timeout = None
+        # the indexer rebuilding the database, and its progress window
+        self.rebuild = None
+        self.progress_dialog = None
+        # the icon of the files without mimetype
+        self.generic_icon = None
         
         self.scroll_win.set_visible(False)
         ##############
-        # connection to the database
-        con = sqlite3.connect(_DATABASE)
+        # connection to the database: migrated and in wal mode, then read only
+        open_database(_DATABASE).close()
+        con = open_readonly(_DATABASE)
+        register_functions(con)
         self.cur = con.cursor()
         
         ##############
@@ -126,171 +234,234 @@ class MainWindow(Gtk.ApplicationWindow):
         self.scroll_win.set_visible(False)
         self.set_default_size(WW, 40)
     
-    # enter pressed
-    def on_activate(self, w):
-        self.list_box.remove_all()
+    def stop_timeout(self):
+        if self.search_timeout != None:
+            GLib.source_remove(self.search_timeout)
+            self.search_timeout = None
+    
+    # text typed: the search starts after a pause
+    def on_changed(self, w):
+        self.stop_timeout()
         _text = self.entry_buffer.get_text()
-        ####
-        self.list_files = []
+        # the results of a longer text are no more shown
+        if len(_text.strip()) < SEARCH_MIN_CHARS:
+            self.worker.cancel()
+            self.list_store.remove_all()
+            self.scroll_win.set_visible(False)
+            self.set_default_size(WW, 40)
+            return
+        self.search_timeout = GLib.timeout_add(SEARCH_DELAY, self.on_search_timeout)
+    
+    # the words typed as prefixes
+    def on_search_timeout(self):
+        self.search_timeout = None
+        self.worker.search(prefix_query(self.entry_buffer.get_text()))
+        return False
+    
+    # enter pressed: the words as typed
+    def on_activate(self, w):
+        self.stop_timeout()
         ### AND
-        try:
-            self.cur.execute("""select name, mime, dir, ROWID from tabella where content match ?""", (_text,))
-            rae = self.cur.fetchall()
-            for lenrae in range(len(rae)):
-                nname = rae[lenrae][0]
-                ttype = rae[lenrae][1]
-                ffolder = rae[lenrae][2]
-                rrowid = rae[lenrae][3]
-                self.list_files.append([nname,ttype,ffolder, rrowid])
-        except Exception as E:
-            self.list_files = []
+        self.worker.search(self.entry_buffer.get_text())
+    
+    # the results of the last search
+    def on_results(self, _generation, _text, _results, _error):
+        if _generation != self.worker.generation:
+            return False
+        if _error != None:
+            self.error_label.set_label("{} {}".format(WSEARCHERROR, _error))
+        self.error_label.set_visible(_error != None)
+        self.list_store.remove_all()
+        self.search_text = _text
+        self.results = _results
+        self.loaded = 0
+        self.load_page()
         #
-        if len(self.list_files) > 0:
+        if self.list_store.get_n_items() > 0:
             self.scroll_win.set_visible(True)
             self.set_default_size(WW, HH)
-        ##
-        # list_path = []
-        for el in self.list_files:
-            # _label = el[0]
-            _label = el[0]+"\n"+"<i><small>"+el[2]+"</small></i>"
-            row = Gtk.ListBoxRow()
-            row.set_name("lrow")
-            row._item = el
-            row._ret = ""
-            row._name = ""
-            row._data1 = ""
-            # list_path.append(el[2])
-            # if CONTEXTUAL_FETCH or el[1] in ["text/calendar", "text/vcard"]:
-            if el[1] in ["text/calendar", "text/vcard"]:
-                self.cur.execute("SELECT * FROM tabella where ROWID=(?);", (el[3],))
-                ret = self.cur.fetchone()
-                row._ret = ret
-                if el[1] == "text/calendar":
-                    try:
-                        tmp_body = ret[4]
-                        tmp_summ = tmp_body.split("\n")
-                        _cal_summ = ""
-                        _cal_data = ""
-                        for ell in tmp_summ:
-                            if ell.lstrip()[0:8] == "SUMMARY:":
-                                # _label = ell[8:].lstrip()+"\n<i><small>{}</small></i>".format(WCALENDAR)
-                                _cal_summ = ell[8:].lstrip()
-                                row._name = ell[8:].lstrip()
-                                break
-                        date_date = ret[4]
-                        tmp_date = date_date.split("\n")
-                        for ell in tmp_date:
-                            if ell.lstrip()[0:8] == "DTSTART:":
-                                row._data1 = ell[8:].lstrip()
-                                _cal_data = ell[8:].lstrip()
-                                break
-                        # 20260425T120000
-                        if _cal_data != "":
-                            _y,_t = _cal_data.split("T")
-                            _label = _cal_summ+"\n<i><small>{}-{}-{} {}:{}</small></i>".format(_y[0:4],_y[4:6],_y[6:8],_t[0:2],_t[2:4])
-                        else:
-                            _label = _cal_summ+"\n<i><small>{}</small></i>".format(WCALENDAR)
-                    except:
-                        pass
-                elif el[1] == "text/vcard":
-                    try:
-                        tmp_body = ret[4]
-                        tmp_name = tmp_body.split("\n")
-                        for ell in tmp_name:
-                            if ell.lstrip()[0:3] == "FN:":
-                                # _label = ell[2:].lstrip()
-                                _label = ell[3:].lstrip()+"\n<i><small>{}</small></i>".format(WCONTACT)
-                                row._name = ell[3:].lstrip()
-                            elif ell.lstrip()[0:2] == "N:":
-                                row._data1 = ell[2:].lstrip()
-                    except Exception as E:
-                        pass
-            elif el[1] in ["application/mbox","message/rfc822"]:
-                self.cur.execute("SELECT * FROM tabella where ROWID=(?);", (el[3],))
-                ret = self.cur.fetchone()
-                m_data_tmp = ret[4]
-                m_data = m_data_tmp.split("\n")
-                email_from = ""
-                email_date = ""
-                for eel in m_data:
-                    if eel.lower().lstrip()[0:5] == 'from:':
-                        email_from = eel[5:].lstrip()
-                        row._name = email_from
-                    elif eel.lower().lstrip()[0:5] == 'date:':
-                        email_date = eel[5:].lstrip()
-                        row._data1 = email_date
-                if email_from != "":
-                    _label="{} {}\n<i><small>{}</small></i>".format(WFROM,GLib.markup_escape_text(email_from), GLib.markup_escape_text(email_date))
-            #
-            vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
-            hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
-            vbox.append(hbox)
-            row.set_child(vbox)
-            #
-            if el[1]:
-                _icon = Gio.content_type_get_icon(el[1])
-                _img = Gtk.Image.new_from_gicon(_icon)
-                _img.set_pixel_size(ICON_SIZE)
-                hbox.append(_img)
-            
-            # if icon_theme.has_icon(el[1]):
-                # _pb = icon_theme.lookup_icon(el[1], None, ICON_SIZE, 1, Gtk.TextDirection.NONE, Gtk.IconLookupFlags.FORCE_REGULAR)
-            else:
-                _image_path = os.path.join(main_dir,"icons","generic-icon.svg")
-                _pix = GdkPixbuf.Pixbuf.new_from_file_at_scale(_image_path,ICON_SIZE,ICON_SIZE,True)
-                _pb = Gdk.Texture.new_for_pixbuf(_pix)
-                #
-                # if ROUNDED_IMG:
-                    # _snapshot = Gtk.Snapshot.new()
-                    # #
-                    # _r = Graphene.Rect.alloc()
-                    # _r.init(0,0,ICON_SIZE,ICON_SIZE)
-                    # #
-                    # _rr = Gsk.RoundedRect()
-                    # _rr.init_from_rect(_r, ((ICON_SIZE*ICON_ROUNDENESS)/2))
-                    # _rr.normalize()
-                    # #
-                    # _snapshot.push_rounded_clip(_rr)
-                    # _snapshot.append_texture(_pb, _r)
-                    # _snapshot.pop()
-                    # #
-                    # _rs = Graphene.Size()
-                    # _rs.init(ICON_SIZE,ICON_SIZE)
-                    # _pb = _snapshot.to_paintable(_rs)
-                #
-                _img = Gtk.Image.new_from_paintable(_pb)
-                _img.set_pixel_size(ICON_SIZE)
-                hbox.append(_img)
-            #
-            _lbl1 = Gtk.Label()
-            _lbl1.set_hexpand(True)
-            _lbl1.set_halign(1)
-            _lbl1.set_wrap(True)
-            _lbl1.set_wrap_mode(2)
-            hbox.append(_lbl1)
-            # _lbl1.set_label(_label)
-            _lbl1.set_markup(_label)
+        return False
+    
+    # the next page of results in the list
+    def load_page(self):
+        rae = self.results[self.loaded:self.loaded+RESULT_PAGE]
+        if rae:
+            self.loaded += len(rae)
+            self.list_store.splice(self.list_store.get_n_items(), 0, [resultItem(list(el)) for el in rae])
+    
+    def on_edge_reached(self, _w, _pos):
+        if _pos == Gtk.PositionType.BOTTOM:
+            self.load_page()
+    
+    # the widgets of a row, reused for the items shown in it
+    def on_item_setup(self, _factory, list_item):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=2)
+        vbox.set_name("lrow")
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
+        vbox.append(hbox)
+        #
+        vbox._img = Gtk.Image()
+        vbox._img.set_pixel_size(ICON_SIZE)
+        hbox.append(vbox._img)
+        #
+        _lbl1 = Gtk.Label()
+        _lbl1.set_hexpand(True)
+        _lbl1.set_halign(1)
+        _lbl1.set_wrap(True)
+        _lbl1.set_wrap_mode(2)
+        hbox.append(_lbl1)
+        vbox._lbl1 = _lbl1
+        #
+        # if el[1] not in ["application/mbox","message/rfc822"]:
+        # btn_stack = Gtk.Button(label=">")
+        btn_stack = Gtk.Button()
+        btn_stack.add_css_class("flat")
+        btn_stack.set_name("databtn")
+        
+        _btn_icon_name = "arrow-right"
+        if icon_theme.has_icon(_btn_icon_name):
+            ICON_SIZE2 = 16
+            _pb = icon_theme.lookup_icon(_btn_icon_name, None, ICON_SIZE2, 1, Gtk.TextDirection.NONE, Gtk.IconLookupFlags.FORCE_REGULAR)
+            _img = Gtk.Image.new_from_paintable(_pb)
+            # _img.set_pixel_size(ICON_SIZE2)
+            btn_stack.set_child(_img)
+        else:
+            btn_stack.set_label(">")
+        
+        # the item shown in the row
+        btn_stack._r = None
+        btn_stack.connect("clicked", lambda _b: self.on_btn_stack(_b, _b._r))
+        hbox.append(btn_stack)
+        vbox._btn = btn_stack
+        #
+        list_item.set_child(vbox)
+    
+    # an item shown in a row
+    def on_item_bind(self, _factory, list_item):
+        vbox = list_item.get_child()
+        row = list_item.get_item()
+        el = row._item
+        if row._label == None:
+            row._label = self.item_label(row)
+        #
+        if el[1]:
+            _icon = Gio.content_type_get_icon(el[1])
+            vbox._img.set_from_gicon(_icon)
+        
+        # if icon_theme.has_icon(el[1]):
+            # _pb = icon_theme.lookup_icon(el[1], None, ICON_SIZE, 1, Gtk.TextDirection.NONE, Gtk.IconLookupFlags.FORCE_REGULAR)
+        else:
+            vbox._img.set_from_paintable(self.get_generic_icon())
+        # _lbl1.set_label(_label)
+        vbox._lbl1.set_markup(row._label)
+        vbox._btn._r = row
+    
+    def get_generic_icon(self):
+        if self.generic_icon == None:
+            _image_path = os.path.join(main_dir,"icons","generic-icon.svg")
+            _pix = GdkPixbuf.Pixbuf.new_from_file_at_scale(_image_path,ICON_SIZE,ICON_SIZE,True)
+            _pb = Gdk.Texture.new_for_pixbuf(_pix)
             #
-            # if el[1] not in ["application/mbox","message/rfc822"]:
-            # btn_stack = Gtk.Button(label=">")
-            btn_stack = Gtk.Button()
-            btn_stack.add_css_class("flat")
-            btn_stack.set_name("databtn")
-            
-            _btn_icon_name = "arrow-right"
-            if icon_theme.has_icon(_btn_icon_name):
-                ICON_SIZE2 = 16
-                _pb = icon_theme.lookup_icon(_btn_icon_name, None, ICON_SIZE2, 1, Gtk.TextDirection.NONE, Gtk.IconLookupFlags.FORCE_REGULAR)
-                _img = Gtk.Image.new_from_paintable(_pb)
-                # _img.set_pixel_size(ICON_SIZE2)
-                btn_stack.set_child(_img)
-            else:
-                btn_stack.set_label(">")
-            
-            btn_stack.connect("clicked", self.on_btn_stack, row)
-            hbox.append(btn_stack)
+            # if ROUNDED_IMG:
+                # _snapshot = Gtk.Snapshot.new()
+                # #
+                # _r = Graphene.Rect.alloc()
+                # _r.init(0,0,ICON_SIZE,ICON_SIZE)
+                # #
+                # _rr = Gsk.RoundedRect()
+                # _rr.init_from_rect(_r, ((ICON_SIZE*ICON_ROUNDENESS)/2))
+                # _rr.normalize()
+                # #
+                # _snapshot.push_rounded_clip(_rr)
+                # _snapshot.append_texture(_pb, _r)
+                # _snapshot.pop()
+                # #
+                # _rs = Graphene.Size()
+                # _rs.init(ICON_SIZE,ICON_SIZE)
+                # _pb = _snapshot.to_paintable(_rs)
             #
-            self.list_box.append(row)
+            self.generic_icon = _pb
+        return self.generic_icon
+    
+    def on_list_view(self, _w, _pos):
+        self.on_list_box(_w, self.list_store.get_item(_pos))
+    
+    # the label of an item: name and folder, or the data of events, contacts and mails
+    def item_label(self, row):
+        el = row._item
+        # _label = el[0]
+        _label = el[0]+"\n"+"<i><small>"+el[2]+"</small></i>"
+        # if CONTEXTUAL_FETCH or el[1] in ["text/calendar", "text/vcard"]:
+        if el[1] in ["text/calendar", "text/vcard"]:
+            self.cur.execute("SELECT content FROM tabella where docid=(?);", (el[3],))
+            ret = self.cur.fetchone()
+            row._ret = ret
+            if el[1] == "text/calendar":
+                try:
+                    tmp_body = ret[0]
+                    tmp_summ = tmp_body.split("\n")
+                    _cal_summ = ""
+                    _cal_data = ""
+                    for ell in tmp_summ:
+                        if ell.lstrip()[0:8] == "SUMMARY:":
+                            # _label = ell[8:].lstrip()+"\n<i><small>{}</small></i>".format(WCALENDAR)
+                            _cal_summ = ell[8:].lstrip()
+                            row._name = ell[8:].lstrip()
+                            break
+                    date_date = ret[0]
+                    tmp_date = date_date.split("\n")
+                    for ell in tmp_date:
+                        if ell.lstrip()[0:8] == "DTSTART:":
+                            row._data1 = ell[8:].lstrip()
+                            _cal_data = ell[8:].lstrip()
+                            break
+                    # 20260425T120000
+                    if _cal_data != "":
+                        _y,_t = _cal_data.split("T")
+                        _label = _cal_summ+"\n<i><small>{}-{}-{} {}:{}</small></i>".format(_y[0:4],_y[4:6],_y[6:8],_t[0:2],_t[2:4])
+                    else:
+                        _label = _cal_summ+"\n<i><small>{}</small></i>".format(WCALENDAR)
+                except:
+                    pass
+            elif el[1] == "text/vcard":
+                try:
+                    tmp_body = ret[0]
+                    tmp_name = tmp_body.split("\n")
+                    for ell in tmp_name:
+                        if ell.lstrip()[0:3] == "FN:":
+                            # _label = ell[2:].lstrip()
+                            _label = ell[3:].lstrip()+"\n<i><small>{}</small></i>".format(WCONTACT)
+                            row._name = ell[3:].lstrip()
+                        elif ell.lstrip()[0:2] == "N:":
+                            row._data1 = ell[2:].lstrip()
+                except Exception as E:
+                    pass
+        elif el[1] in ["application/mbox","message/rfc822"]:
+            self.cur.execute("SELECT content FROM tabella where docid=(?);", (el[3],))
+            ret = self.cur.fetchone()
+            # where the message starts in the mbox file
+            row._offset = ""
+            # the row deleted by the indexer after the search
+            if ret == None:
+                return _label
+            m_data_tmp = ret[0]
+            m_data = m_data_tmp.split("\n")
+            email_from = ""
+            email_date = ""
+            for eel in m_data:
+                if eel.lower().lstrip()[0:5] == 'from:':
+                    email_from = eel[5:].lstrip()
+                    row._name = email_from
+                elif eel.lower().lstrip()[0:5] == 'date:':
+                    email_date = eel[5:].lstrip()
+                    row._data1 = email_date
+            if email_from != "":
+                _label="{} {}\n<i><small>{}</small></i>".format(WFROM,GLib.markup_escape_text(email_from), GLib.markup_escape_text(email_date))
+            self.cur.execute("SELECT offset FROM rowoffset where docid=(?);", (el[3],))
+            _offset = self.cur.fetchone()
+            if _offset != None:
+                row._offset = str(_offset[0])
+        return _label
     
     # open the file with its default application if registered
     def on_list_box(self, _w, _r):
@@ -309,8 +480,12 @@ class MainWindow(Gtk.ApplicationWindow):
             elif _type in ["message/rfc822","application/mbox"]:
                 f_exec = os.path.join(main_dir,"email.sh")
                 f_data1 = _r._data1
+            _args = [f_exec, f_data, f_data1]
+            # the mbox file and the byte offset of the message
+            if _type == "application/mbox":
+                _args.extend([item[2]+"/"+item[0], _r._offset])
             try:
-                subprocess.Popen([f_exec, f_data, f_data1])
+                subprocess.Popen(_args)
                 self.close()
             except:
                 pass
@@ -421,13 +596,14 @@ class MainWindow(Gtk.ApplicationWindow):
         
     
     def on_get_data(self, _r, stack_list):
-        _text = self.entry_buffer.get_text()
+        # the text of the search shown
+        _text = self.search_text
         item = _r._item
         _type = item[1]
         _row = item[3]
         if CONTEXTUAL_FETCH == 1:
             item_content = _r._ret
-            _data = item_content[4]
+            _data = item_content[0]
             list_text = []
             # list of searching terms
             temp3 = _text.split()
@@ -453,62 +629,19 @@ class MainWindow(Gtk.ApplicationWindow):
                     rret = 0
                     self.populate_list(_l, _type, stack_list, _row)
         else:
-            _file = item[0]
-            _id = item[3]
-            self.cur.execute("""select offsets(tabella) from tabella where name=? AND content match ? AND ROWID=(?)""", (_file, _text, _id))
-            ret = self.cur.fetchall()
-            _data_tmp = ret[0][0]
-            _data = _data_tmp.split(" ")
-            len_data = len(_data)
-            ###
-            list_data = []
-            for i in range(0,len_data,4):
-                list_data.append([_data[i],_data[i+1],_data[i+2],_data[i+3]])
-            # LIST DATA::  [['4', '0', '5', '7'], ['4', '0', '31', '7']]
-            
-            namefile = item[0]
-            pathfile = item[2]
-            
-            # the starting character - index
-            _start = 0
-            # the last character to extract - index
-            _end = PREVIEW
-            
-            for i in range(len(list_data)):
-                _d = list_data[i]
-                if int(_d[2]) > int(PREVIEW/2):
-                    _start = int(PREVIEW/3)
-                    _end = _start*3
-                elif int(_d[2]) > PREVIEW:
-                    _start = int(PREVIEW/2)
-                    _end = _start*2
-                    
-                # the bound preview of the seeking text
-                # self.cur.execute("""select substr(content,?,?) from tabella where name=(?) and dir=(?)""", (_start, _end, namefile, pathfile))
-                self.cur.execute("""select substr(content,?,?) from tabella where name=(?) and dir=(?) and ROWID=(?)""", (_start, _end, namefile, pathfile, _id))
-                ret = self.cur.fetchall()
-                # list of searching terms
-                temp3 = _text.split()
-                # remove OR if or is chosed
-                try:
-                    temp3.remove("OR")
-                except:
-                    pass
-                
-                # use the markup or not
-                if USE_MARKUP:
-                    dic = {x: '<b>'+x+'</b>' for x in temp3}
-                    # replace and set to bold each searched word
-                    def replace_all(text, dic):
-                        for i, j in dic.items():
-                            text = text.replace(i, j)
-                        return text
-                    
-                    aaaaa = ret[0][0]
-                    aaaaal = replace_all(aaaaa.lower().replace("<", "&lt;").replace(">", "&gt;"),dic)
-                    self.populate_list(aaaaal, _type, stack_list, _row)
-                else:
-                    self.populate_list(ret[0][0], _type, stack_list, _row)
+            # the previews of the same search in the same row are computed once
+            _key = ("preview", _text, item[3])
+            _generation = index_generation(self.cur)
+            _previews = query_cache.get(_key, _generation)
+            if _previews == None:
+                _previews = self.get_previews(item, _text)
+                query_cache.put(_key, _previews, _generation)
+            for el in _previews:
+                self.populate_list(el, _type, stack_list, _row)
+    
+    # the pieces of the content with the words searched, as markup
+    def get_previews(self, item, _text):
+        return row_snippets(self.cur, item[3], _text, USE_MARKUP == 1)
     
     def on_key_pressed(self, event, keyval, keycode, state):
         if keyval == Gdk.KEY_Escape:
@@ -534,15 +667,114 @@ class MainWindow(Gtk.ApplicationWindow):
         self.scroll_win.set_visible(False)
         self.set_default_size(WW, 40)
         
+        # already running
+        if self.rebuild != None:
+            self.progress_dialog.present()
+            return
         try:
             _p = os.path.join(main_dir, "indexerdb.py")
-            ret = subprocess.run([_p], capture_output=True, text=True)
-            ret_code = ret.returncode
-            ret_stdout = ret.stdout
-            myDialog(self, ret_stdout.strip("\n").split(" "))
-        except:
-            pass
+            self.rebuild = Gio.Subprocess.new([_p, "--unthrottled", "--progress"], Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_PIPE)
+        except GLib.Error as E:
+            self.rebuild = None
+            messageDialog(self, "{} {}".format(WREBUILDFAILED, E.message))
+            return
+        # the end of the rebuild: the exit status (-1 if killed) and stdout of the indexer, the end of stderr, the last message in stderr
+        self.rebuild_out = None
+        self.rebuild_eof = False
+        self.rebuild_message = ""
+        self.progress_dialog = progressDialog(self, self.rebuild)
+        # the progress events, a line at a time
+        _stream = Gio.DataInputStream.new(self.rebuild.get_stderr_pipe())
+        _stream.read_line_async(GLib.PRIORITY_DEFAULT, None, self.on_progress_line, None)
+        self.rebuild.wait_async(None, self.on_rebuild_done, None)
+    
+    def on_progress_line(self, _stream, _res, _data):
+        try:
+            _line, _len = _stream.read_line_finish_utf8(_res)
+        except GLib.Error as E:
+            _line = None
+        # the indexer closed stderr
+        if _line == None:
+            self.rebuild_eof = True
+            self.end_rebuild()
+            return
+        # the other lines are messages of the indexer, the last one is shown if it fails
+        if _line.startswith("{"):
+            try:
+                _event = json.loads(_line)
+                if self.progress_dialog != None:
+                    self.progress_dialog.update(_event)
+            except ValueError:
+                pass
+        elif _line.strip() != "":
+            self.rebuild_message = _line.strip()
+        _stream.read_line_async(GLib.PRIORITY_DEFAULT, None, self.on_progress_line, None)
+    
+    # the counters of the indexing in stdout, when the indexer exits
+    def on_rebuild_done(self, _proc, _res, _data):
+        try:
+            _proc.wait_finish(_res)
+            _out = Gio.DataInputStream.new(_proc.get_stdout_pipe()).read_upto("\0", 1, None)[0] or ""
+        except GLib.Error as E:
+            _out = ""
+        self.rebuild_out = (_proc.get_exit_status() if _proc.get_if_exited() else -1, _out)
+        self.end_rebuild()
+    
+    # when the indexer has exited and all its stderr has been read
+    def end_rebuild(self):
+        if self.rebuild_out == None or not self.rebuild_eof:
+            return
+        (_status, _out) = self.rebuild_out
+        self.rebuild = None
+        self.progress_dialog.close()
+        self.progress_dialog = None
+        _counters = _out.strip("\n").split(" ")
+        if _status == 0 and len(_counters) >= 6:
+            myDialog(self, _counters)
+        # e.g. the indexer in daemon mode
+        elif _status == LOCKED_EXIT:
+            messageDialog(self, WINDEXERRUNNING)
+        else:
+            messageDialog(self, "{} {}".format(WREBUILDFAILED, self.rebuild_message))
+        
+
+# the progress of the rebuild of the database, with a button to stop it
+class progressDialog(Gtk.Window):
+    def __init__(self, _parent, _proc):
+        super().__init__()
+        self._parent = _parent
+        self._proc = _proc
+        self.set_name('mydialog')
+        self.set_transient_for(_parent)
+        # closed when the indexer exits
+        self.set_deletable(False)
+        
+        self.main_box = Gtk.Box.new(1,0)
+        self.set_child(self.main_box)
+        
+        self.lbl = Gtk.Label(label=WREBUILDING)
+        self.lbl.set_wrap(True)
+        self.lbl.set_wrap_mode(2)
+        self.main_box.append(self.lbl)
+        
+        self.btn_cancel = Gtk.Button(label=WCANCEL)
+        self.main_box.append(self.btn_cancel)
+        self.btn_cancel.connect('clicked', self.on_cancel)
         
+        self.set_visible(True)
+    
+    # files: scanned - extracted - skipped - per second - the last one
+    def update(self, _data):
+        if not self.btn_cancel.get_sensitive():
+            return
+        llist = "{} {} \n{} {} \n{} {} \n{} {} \n{}".format(WFSCANNED,_data.get("scanned", 0), WFEXTRACTED,_data.get("extracted", 0), WFDISCHARGED,_data.get("skipped", 0), WFRATE,_data.get("rate", 0), _data.get("file", ""))
+        self.lbl.set_label(llist)
+    
+    # the indexer stops after the last transaction, then exits
+    def on_cancel(self, _b):
+        self.btn_cancel.set_sensitive(False)
+        self.lbl.set_label(WSTOPPING)
+        self._proc.send_signal(signal.SIGTERM)
 
 class myDialog(Gtk.Window):
     def __init__(self, _parent, _data):
@@ -565,6 +797,27 @@ class myDialog(Gtk.Window):
         
         self.set_visible(True)
 
+# a message with a button to close it
+class messageDialog(Gtk.Window):
+    def __init__(self, _parent, _text):
+        super().__init__()
+        self.set_name('mydialog')
+        self.set_transient_for(_parent)
+        
+        self.main_box = Gtk.Box.new(1,0)
+        self.set_child(self.main_box)
+        
+        lbl = Gtk.Label(label=_text)
+        lbl.set_wrap(True)
+        lbl.set_wrap_mode(2)
+        self.main_box.append(lbl)
+        
+        btn_close = Gtk.Button(label=WCLOSE)
+        self.main_box.append(btn_close)
+        btn_close.connect('clicked', lambda _w:self.close())
+        
+        self.set_visible(True)
+
 class MyApp(Gtk.Application):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# the results of the searches already done, kept until the indexer changes the database:
+# the indexer increments the generation in the table indexgen with each commit changing the rows
+
+import sys
+import threading
+from collections import OrderedDict
+from searchercfg import QUERY_CACHE_BYTES
+
+# the generation of the index, incremented by the indexer
+def index_generation(cur):
+    cur.execute("""select generation from indexgen where id=1""")
+    _ret = cur.fetchone()
+    return _ret[0] if _ret != None else None
+
+# the approximate memory used by a value
+def value_size(_value):
+    if isinstance(_value, (list, tuple)):
+        return sys.getsizeof(_value)+sum(value_size(el) for el in _value)
+    return sys.getsizeof(_value)
+
+# least recently used values discarded first, when the memory used is over _budget bytes;
+# used by the main loop and by the search thread
+class queryCache:
+    def __init__(self, _budget=QUERY_CACHE_BYTES):
+        self.budget = _budget
+        self.size = 0
+        # the generation of the index of the values
+        self.generation = None
+        # key: (value, size)
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    # the values of an older generation are discarded
+    def check_generation(self, _generation):
+        if _generation != self.generation:
+            self.items.clear()
+            self.size = 0
+            self.generation = _generation
+
+    # None if not found
+    def get(self, _key, _generation):
+        if _generation == None:
+            return None
+        with self.lock:
+            self.check_generation(_generation)
+            _item = self.items.get(_key)
+            if _item == None:
+                return None
+            self.items.move_to_end(_key)
+            return _item[0]
+
+    def put(self, _key, _value, _generation):
+        if _generation == None:
+            return
+        _size = value_size(_key)+value_size(_value)
+        if _size > self.budget:
+            return
+        with self.lock:
+            self.check_generation(_generation)
+            if _key in self.items:
+                self.size -= self.items.pop(_key)[1]
+            self.items[_key] = (_value, _size)
+            self.size += _size
+            while self.size > self.budget:
+                self.size -= self.items.popitem(last=False)[1][1]
@@ -6,7 +6,7 @@ WINDOWHEIGHT = 600
 LIMIT_TAB = 10
 # for discharging useless tabs
 LIMIT_OFFSET = 250
-# preview max chars
+# preview max bytes of each piece of the content
 PREVIEW=500
 # item icon size
 ICON_SIZE = 64
@@ -15,4 +15,68 @@ USE_MARKUP = 1
 # indexer log files: 0 do not log anything - 1 log everything
 INDEXER_LOG = 0
 # enables launching applications: 0 no - 1 yes
-USE_APPS = 1
\ No newline at end of file
+USE_APPS = 1
+# indexer processes extracting the content of the files: 0 or 1 no pool - 2 or more size of the pool
+INDEXER_WORKERS = 0
+# indexer: rows written into the database in a single transaction
+INDEXER_BATCH_ROWS = 500
+# indexer: seconds after which the waiting rows are written anyway
+INDEXER_BATCH_TIME = 5
+# indexer: at the end of the indexing 0 do nothing - 1 merge the index segments - 2 fully optimize the index
+INDEXER_OPTIMIZE = 1
+# indexer: limits the resources used while indexing: 0 no - 1 yes (not when launched from this program)
+INDEXER_THROTTLE = 1
+# indexer: max files processed per second - 0 no limit
+INDEXER_MAX_FILES = 100
+# indexer: max bytes read per second - 0 no limit
+INDEXER_MAX_BYTES = 0
+# indexer: pause while the system load average is higher - 0 do not check
+INDEXER_MAX_LOAD = 0
+# indexer: pause while the cpu time in iowait is higher than this percentage - 0 do not check
+INDEXER_MAX_IOWAIT = 30
+# indexer: seconds between the checks of the system load
+INDEXER_PAUSE = 2
+# indexer: how deep the subfolders are indexed: -1 no limit - 0 only the folders in path_list.cfg
+INDEXER_MAX_DEPTH = -1
+# indexer: follow the links to other folders: 0 no - 1 yes
+INDEXER_FOLLOW_LINKS = 1
+# indexer: only the files whose name (or full path, if the pattern contains /) matches one of these patterns - empty list all files
+INDEXER_INCLUDE = []
+# indexer: files and folders skipped, as above
+INDEXER_EXCLUDE = [".*"]
+# indexer in daemon mode: seconds without changes before indexing the changed files
+INDEXER_DEBOUNCE = 2
+# indexer in daemon mode: max seconds the changed files wait to be indexed
+INDEXER_DEBOUNCE_MAX = 30
+# indexer: office documents: 0 a libreoffice process for each document - 1 a long running libreoffice for each process doing the extraction
+OFFICE_WORKER = 1
+# indexer: the long running libreoffice is restarted after these documents
+OFFICE_MAX_DOCS = 200
+# indexer: seconds before a libreoffice conversion is considered hung
+OFFICE_TIMEOUT = 60
+# indexer: max bytes of text stored for each document, the rest is not read - 0 no limit
+INDEXER_MAX_DOC_BYTES = 10485760
+# results loaded at a time, the next ones when the end of the list is reached
+RESULT_PAGE = 100
+# search: weight of each column in the ranking of the results - content, metadata, tag1 - 0 not searched
+RANK_WEIGHTS = [1, 2, 2]
+# search: max results, the best ones
+RESULT_TOP_K = 1000
+# search while typing: milliseconds of pause after the last key before searching
+SEARCH_DELAY = 300
+# search while typing: min characters typed to search
+SEARCH_MIN_CHARS = 2
+# search: memory used by the cache of the results and of the previews, in bytes
+QUERY_CACHE_BYTES = 8388608
+# search: pieces of the content shown for each result, those with more words searched
+SNIPPET_WINDOWS = 3
+# database: bytes of the database mapped in memory
+DB_MMAP_SIZE = 268435456
+# database: pages cached by each connection, negative in KiB
+DB_CACHE_SIZE = -65536
+# database: milliseconds waiting for a lock before failing
+DB_BUSY_TIMEOUT = 5000
+# indexer: seconds between the progress events written for the main program
+INDEXER_PROGRESS = 0.5
+# indexer: the time spent in each phase and by each extractor, in LOGS: 0 no - 1 indexer_metrics.json - 2 indexer_metrics.prom (prometheus text format)
+INDEXER_METRICS = 0
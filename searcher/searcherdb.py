@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+# the schema of the database, shared by the indexer and the search window:
+# the version is in pragma user_version and the older databases are migrated when opened
+#
+# version 1: tabella fts4(name, mime, mtime, dir, content, metadata, tag1), all the columns tokenized
+# version 2: the attributes of the files in files, with b-tree indexes;
+#            only the text in tabella fts4(content, metadata, tag1), same docid
+# version 3: the text stored compressed with zlib in tabella, through the fts4 compress and uncompress functions,
+#            which must be registered on every connection
+# version 4: the tables of the indexer: mimecache, filestate, rowoffset and indexgen
+#
+# the database is in wal mode: the searches read while the indexer writes, from read-only connections
+
+import os
+import zlib
+import fcntl
+import sqlite3
+from pathlib import Path
+from searchercfg import DB_MMAP_SIZE, DB_CACHE_SIZE, DB_BUSY_TIMEOUT
+
+SCHEMA_VERSION = 4
+
+# the exit status of an indexer finding another one writing into the same database
+LOCKED_EXIT = 75
+
+# the texts shorter than this are stored as they are
+COMPRESS_MIN = 128
+# zlib compression level
+COMPRESS_LEVEL = 6
+
+# the options of the full text table
+FTS_OPTIONS = "content, metadata, tag1, compress=searcher_compress, uncompress=searcher_uncompress"
+
+# a compressed text is a blob, the other values are not changed
+def compress(_value):
+    if isinstance(_value, str) and len(_value) >= COMPRESS_MIN:
+        return zlib.compress(_value.encode("utf-8"), COMPRESS_LEVEL)
+    return _value
+
+def uncompress(_value):
+    if isinstance(_value, bytes):
+        return zlib.decompress(_value).decode("utf-8")
+    return _value
+
+# the functions needed to read and write tabella
+def register_compression(con):
+    con.create_function("searcher_compress", 1, compress, deterministic=True)
+    con.create_function("searcher_uncompress", 1, uncompress, deterministic=True)
+
+def table_columns(cur, _table):
+    cur.execute("""pragma table_info({})""".format(_table))
+    return [el[1] for el in cur.fetchall()]
+
+def create_files(cur):
+    cur.execute("""create table if not exists files (docid INTEGER PRIMARY KEY, name TEXT, mime TEXT, mtime REAL, dir TEXT)""")
+    cur.execute("""create index if not exists files_dir_name on files (dir, name)""")
+    cur.execute("""create index if not exists files_mime on files (mime)""")
+    cur.execute("""create index if not exists files_mtime on files (mtime)""")
+
+# the tables of the indexer
+def create_indexer_tables(cur):
+    # the mimetype of the files already seen, not changed if size and modification time are the same
+    cur.execute("""create table if not exists mimecache (dev INTEGER, ino INTEGER, size INTEGER, mtime REAL, mime TEXT, PRIMARY KEY(dev, ino)) WITHOUT ROWID""")
+    # the state of the indexed files, to find out which ones are new or changed
+    # truncated: 1 if the content is longer than INDEXER_MAX_DOC_BYTES and only the first part has been stored
+    # resume: where the content not yet indexed starts, for the files indexed in parts (e.g. mbox), and the checksum of the bytes before it
+    cur.execute("""create table if not exists filestate (dir TEXT, name TEXT, mtime REAL, size INTEGER, ino INTEGER, mime TEXT, docids TEXT, truncated INTEGER DEFAULT 0, resume INTEGER, resumesum TEXT, PRIMARY KEY(dir, name)) WITHOUT ROWID""")
+    # the byte offset where a row starts in its file, e.g. a message in a mbox file
+    cur.execute("""create table if not exists rowoffset (docid INTEGER PRIMARY KEY, offset INTEGER)""")
+    # incremented with each commit changing the rows, the searches cached before are no more valid
+    cur.execute("""create table if not exists indexgen (id INTEGER PRIMARY KEY, generation INTEGER)""")
+    cur.execute("""insert or ignore into indexgen (id, generation) values (1, 0)""")
+
+def create_schema(cur):
+    create_files(cur)
+    cur.execute("""create virtual table if not exists tabella using fts4({})""".format(FTS_OPTIONS))
+    create_indexer_tables(cur)
+
+# the text indexed again in a new table, which replaces tabella
+def rebuild_tabella(cur):
+    cur.execute("""create virtual table tabella_new using fts4({})""".format(FTS_OPTIONS))
+    cur.execute("""insert into tabella_new (docid, content, metadata, tag1) select docid, content, metadata, tag1 from tabella""")
+    cur.execute("""drop table tabella""")
+    cur.execute("""alter table tabella_new rename to tabella""")
+
+# the attributes out of the full text index
+def migrate_v1(cur):
+    create_files(cur)
+    cur.execute("""insert into files (docid, name, mime, mtime, dir) select docid, name, mime, mtime, dir from tabella""")
+    rebuild_tabella(cur)
+
+# the tables of the indexer, created by the indexer itself until version 3, maybe by an older indexer
+def migrate_v3(cur):
+    _columns = table_columns(cur, "filestate")
+    create_indexer_tables(cur)
+    if _columns:
+        for (_column, _type) in [("truncated", "INTEGER DEFAULT 0"), ("resume", "INTEGER"), ("resumesum", "TEXT")]:
+            if _column not in _columns:
+                cur.execute("""alter table filestate add column {} {}""".format(_column, _type))
+    else:
+        # the files indexed before: size and inode unknown
+        cur.execute("""insert into filestate (dir, name, mtime, size, ino, mime, docids) select dir, name, max(mtime), NULL, NULL, max(mime), group_concat(docid) from files group by dir, name""")
+
+# brings the database to SCHEMA_VERSION, in a single transaction, a version after the other
+def migrate(con):
+    cur = con.cursor()
+    cur.execute("""pragma user_version""")
+    _version = cur.fetchone()[0]
+    if _version >= SCHEMA_VERSION:
+        return
+    _migrated = False
+    cur.execute("""begin immediate""")
+    try:
+        if _version == 0:
+            # version 1 had no version number
+            if "name" in table_columns(cur, "tabella"):
+                # to version 3
+                migrate_v1(cur)
+                _version = 3
+                _migrated = True
+            else:
+                create_schema(cur)
+                _version = SCHEMA_VERSION
+        if _version == 2:
+            # the text compressed
+            rebuild_tabella(cur)
+            _version = 3
+            _migrated = True
+        if _version == 3:
+            migrate_v3(cur)
+        cur.execute("""pragma user_version={}""".format(SCHEMA_VERSION))
+        cur.execute("""commit""")
+    except Exception:
+        cur.execute("""rollback""")
+        raise
+    # the space of the old index
+    if _migrated:
+        cur.execute("""vacuum""")
+
+# the settings of each connection: waits the locks up to DB_BUSY_TIMEOUT ms,
+# the database mapped in memory and the pages cached
+def tune(con):
+    con.execute("""pragma busy_timeout={}""".format(int(DB_BUSY_TIMEOUT)))
+    con.execute("""pragma mmap_size={}""".format(int(DB_MMAP_SIZE)))
+    con.execute("""pragma cache_size={}""".format(int(DB_CACHE_SIZE)))
+
+# a connection to write into the database, migrated if needed
+def open_database(_path):
+    con = sqlite3.connect(_path, timeout=DB_BUSY_TIMEOUT/1000)
+    register_compression(con)
+    tune(con)
+    # stored in the database, also for the other connections
+    con.execute("""pragma journal_mode=WAL""")
+    # in wal mode the database is not corrupted by a crash, only the last commits may be lost
+    con.execute("""pragma synchronous=NORMAL""")
+    migrate(con)
+    return con
+
+# a single indexer at a time writes into a database: the lock is held until the returned file is closed,
+# or the process exits; raises BlockingIOError if another indexer holds it
+def lock_database(_path):
+    _f = open(_path+".lock", "w")
+    try:
+        fcntl.flock(_f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        _f.close()
+        raise
+    return _f
+
+# a read-only connection, to a database already migrated; the path escaped in the uri, it may contain # ? %
+def open_readonly(_path):
+    con = sqlite3.connect("{}?mode=ro".format(Path(os.path.abspath(_path)).as_uri()), uri=True, timeout=DB_BUSY_TIMEOUT/1000)
+    register_compression(con)
+    tune(con)
+    return con
+
+# copies the pages of the write-ahead log into the database: PASSIVE as far as the readers allow,
+# TRUNCATE waits for the readers and empties the log
+def checkpoint(con, _mode="PASSIVE"):
+    try:
+        con.execute("""pragma wal_checkpoint({})""".format(_mode))
+    except sqlite3.OperationalError:
+        # still busy, the next checkpoint will do
+        pass
@@ -12,4 +12,13 @@ WMISSINGFOLDERS="Missing folders:"
 WISSUESINDEXING="Issues during indexing:"
 WFROM="From:"
 WCALENDAR="(Calendar event)"
-WCONTACT="(Contact)"
\ No newline at end of file
+WCONTACT="(Contact)"
+WSEARCHERROR="Search failed:"
+WREBUILDING="Rebuilding the database..."
+WCANCEL="Cancel"
+WSTOPPING="Stopping..."
+WFSCANNED="File scanned:"
+WFEXTRACTED="File extracted:"
+WFRATE="Files per second:"
+WREBUILDFAILED="The indexing failed:"
+WINDEXERRUNNING="Another indexer is updating the database, e.g. in daemon mode: try again when it has finished."
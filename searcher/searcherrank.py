@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# ranking of the search results with okapi bm25, from the matchinfo of the fts4 table
+
+import math
+import struct
+from searchercfg import RANK_WEIGHTS
+
+# term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# the format of matchinfo used by bm25
+MATCHINFO_FORMAT = "pcnalx"
+
+# the score of a row: matchinfo(tabella, 'pcnalx') and the weight of each column,
+# the columns without weight count 1; the higher the better
+def bm25(_matchinfo, *_weights):
+    _info = struct.unpack("@{}I".format(len(_matchinfo)//4), _matchinfo)
+    # phrases, columns, rows in the table
+    _p, _c, _n = _info[0], _info[1], _info[2]
+    # average tokens of each column, tokens of each column of this row
+    _avg = _info[3:3+_c]
+    _len = _info[3+_c:3+2*_c]
+    # hits of each phrase in each column: in this row, in all the rows, rows with hits
+    _x = 3+2*_c
+    _score = 0.0
+    for j in range(_c):
+        _w = _weights[j] if j < len(_weights) else 1
+        if _w == 0:
+            continue
+        _norm = BM25_K1*(1-BM25_B+BM25_B*(_len[j]/_avg[j] if _avg[j] else 0))
+        for i in range(_p):
+            _pos = _x+3*(i*_c+j)
+            _hits = _info[_pos]
+            if _hits == 0:
+                continue
+            _idf = math.log(1+(_n-_info[_pos+2]+0.5)/(_info[_pos+2]+0.5))
+            _score += _w*_idf*_hits*(BM25_K1+1)/(_hits+_norm)
+    return _score
+
+# the functions used in the queries, for each connection
+def register_functions(con):
+    con.create_function("bm25", -1, bm25, deterministic=True)
+
+# the top _limit rows matching _text, the best first: (name, mime, dir, docid);
+# only the rows with hits in the columns with a weight
+def ranked_search(cur, _text, _limit):
+    _weights = ", ".join(str(float(el)) for el in RANK_WEIGHTS)
+    cur.execute("""select files.name, files.mime, files.dir, files.docid from (select docid, bm25(matchinfo(tabella, '{}'), {}) as rank from tabella where tabella match ?) as ranked join files on files.docid=ranked.docid where rank > 0 order by rank desc limit ?""".format(MATCHINFO_FORMAT, _weights), (_text, _limit))
+    return cur.fetchall()
+
+# the words of _text as prefixes (word*), for the search while typing:
+# operators, phrases and words with the fts syntax are not changed
+def prefix_query(_text):
+    _ret = []
+    _phrase = False
+    for el in _text.split():
+        # inside a phrase
+        if _phrase or el.startswith('"'):
+            _phrase = not el.endswith('"') or (el == '"' and not _phrase)
+            _ret.append(el)
+        elif el in ("OR", "AND", "NOT", "NEAR") or not el.isalnum():
+            _ret.append(el)
+        else:
+            _ret.append(el+"*")
+    return " ".join(_ret)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# the pieces of the content of a row with the words searched, as pango markup:
+# the offsets of the words and the content with a single query, the offsets
+# are in bytes of the text encoded in utf-8
+
+from bisect import bisect_left, bisect_right
+from searchercfg import PREVIEW, SNIPPET_WINDOWS
+
+# the column of the content in tabella
+CONTENT_COLUMN = 0
+
+def escape(_text):
+    return _text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def decode(_data):
+    return _data.decode("utf-8", errors="replace")
+
+# the window moved to the bounds of the characters, not in the middle of a utf-8 sequence
+def char_bounds(_content, _start, _end):
+    while _start < len(_content) and _content[_start] & 0xC0 == 0x80:
+        _start += 1
+    while _end < len(_content) and _end > _start and _content[_end] & 0xC0 == 0x80:
+        _end -= 1
+    return _start, _end
+
+# the _n windows of _size bytes with more different words searched, then more hits, in the order of the content;
+# _hits: (offset, size, term) sorted by offset
+def best_windows(_content, _hits, _n, _size):
+    if not _hits:
+        return [char_bounds(_content, 0, min(len(_content), _size))]
+    _offsets = [el[0] for el in _hits]
+    _candidates = []
+    for (_off, _len, _term) in _hits:
+        # the hit in the first third of the window
+        _start = max(0, min(_off-_size//3, len(_content)-_size))
+        _end = min(len(_content), _start+_size)
+        _in = [el for el in _hits[bisect_left(_offsets, _start):bisect_right(_offsets, _end-1)] if el[0]+el[1] <= _end]
+        _candidates.append(((len(set(el[2] for el in _in)), len(_in)), _start, _end))
+    _candidates.sort(key=lambda el: el[0], reverse=True)
+    _chosen = []
+    for (_score, _start, _end) in _candidates:
+        if all(_end <= el[0] or _start >= el[1] for el in _chosen):
+            _chosen.append((_start, _end))
+            if len(_chosen) == _n:
+                break
+    return [char_bounds(_content, _start, _end) for (_start, _end) in sorted(_chosen)]
+
+# the markup of a window, in a single pass: the words searched in bold if _bold
+def window_markup(_content, _start, _end, _hits, _bold):
+    _offsets = [el[0] for el in _hits]
+    _parts = ["…"] if _start > 0 else []
+    _pos = _start
+    for (_off, _len, _term) in _hits[bisect_left(_offsets, _start):bisect_right(_offsets, _end-1)]:
+        if _off < _pos or _off+_len > _end:
+            continue
+        _parts.append(escape(decode(_content[_pos:_off])))
+        _word = escape(decode(_content[_off:_off+_len]))
+        _parts.append("<b>"+_word+"</b>" if _bold else _word)
+        _pos = _off+_len
+    _parts.append(escape(decode(_content[_pos:_end])))
+    if _end < len(_content):
+        _parts.append("…")
+    return "".join(_parts)
+
+# the best pieces of the content of the row _docid for the search _text
+def row_snippets(cur, _docid, _text, _bold=True, _n=SNIPPET_WINDOWS, _size=PREVIEW):
+    cur.execute("""select offsets(tabella), content from tabella where docid=? and tabella match ?""", (_docid, _text))
+    _ret = cur.fetchone()
+    if _ret == None:
+        return []
+    _content = (_ret[1] or "").encode("utf-8")
+    _data = [int(el) for el in _ret[0].split()]
+    # column, term, offset, size: only the hits in the content
+    _hits = sorted((_data[i+2], _data[i+3], _data[i+1]) for i in range(0, len(_data), 4) if _data[i] == CONTENT_COLUMN)
+    return [window_markup(_content, _start, _end, _hits, _bold) for (_start, _end) in best_windows(_content, _hits, _n, _size)]